@@ -2,8 +2,10 @@
 
 import os
 import imp
+import codecs
 import sys
 import site
+import socket
 
 __all__ = ['WindowsError']
 
@@ -49,6 +51,11 @@ if sys.version_info >= (3,):
     def u(s):
         return s.decode('utf-8')
 
+    def u_decoder():
+        """Return a function that decodes utf-8 bytes fed to it chunk by
+        chunk, like u() does for a whole string."""
+        return codecs.getincrementaldecoder('utf-8')().decode
+
     def console_to_str(s):
         try:
             return s.decode(console_encoding)
@@ -61,6 +68,21 @@ if sys.version_info >= (3,):
     def get_http_message_param(http_message, param, default_value):
         return http_message.get_param(param, default_value)
 
+    def get_request_host(request):
+        return request.host
+
+    def get_request_selector(request):
+        return request.selector
+
+    def get_request_data(request):
+        return request.data
+
+    def wrap_http_response(response, url):
+        """Make an httplib response look like one from urllib2.urlopen()"""
+        response.url = url
+        response.msg = response.reason
+        return response
+
     install_skip_reqs = {
         'distribute' : 'Can not install distribute due to bootstrap issues'
         }
@@ -89,6 +111,9 @@ else:
     def u(s):
         return s
 
+    def u_decoder():
+        return lambda s, final=False: s
+
     def console_to_str(s):
         return s
 
@@ -99,6 +124,24 @@ else:
         result = http_message.getparam(param)
         return result or default_value
 
+    def get_request_host(request):
+        return request.get_host()
+
+    def get_request_selector(request):
+        return request.get_selector()
+
+    def get_request_data(request):
+        return request.get_data()
+
+    def wrap_http_response(response, url):
+        """Make an httplib response look like one from urllib2.urlopen()"""
+        response.recv = response.read
+        fp = socket._fileobject(response, close=True)
+        wrapped = urllib.addinfourl(fp, response.msg, url)
+        wrapped.code = response.status
+        wrapped.msg = response.reason
+        return wrapped
+
     install_skip_reqs = {}
     wheel_skip_reqs = {}
     bytes = str
@@ -9,7 +9,7 @@ import time
 import optparse
 
 from pip.log import logger
-from pip.download import urlopen
+from pip.download import urlopen, retry_policy
 from pip.exceptions import (BadCommand, InstallationError, UninstallationError,
                             CommandError)
 from pip.backwardcompat import StringIO
@@ -74,7 +74,8 @@ class Command(object):
                  'timeout', 'default_vcs',
                  'skip_requirements_regex',
                  'no_input', 'exists_action',
-                 'cert']
+                 'cert', 'retries', 'retry_backoff', 'retry_status',
+                 'retry_deadline']
         for attr in attrs:
             setattr(options, attr, getattr(initial_options, attr) or getattr(options, attr))
         options.quiet += initial_options.quiet
@@ -127,6 +128,10 @@ class Command(object):
         socket.setdefaulttimeout(options.timeout or None)
 
         urlopen.setup(proxystr=options.proxy, prompting=not options.no_input)
+        retry_policy.setup(retries=options.retries,
+                           backoff=options.retry_backoff,
+                           statuses=options.retry_status,
+                           deadline=options.retry_deadline)
 
         exit = SUCCESS
         store_log = False
@@ -329,6 +329,42 @@ standard_options = [
         default=15,
         help='Set the socket timeout (default %default seconds).'),
 
+    optparse.make_option(
+        '--retries',
+        metavar='n',
+        dest='retries',
+        type='int',
+        default=0,
+        help='Retry failed requests up to <n> times, if the error may be '
+             'transient, before trying a mirror (default %default).'),
+
+    optparse.make_option(
+        '--retry-backoff',
+        metavar='sec',
+        dest='retry_backoff',
+        type='float',
+        default=0.5,
+        help='Wait up to <sec> seconds before the first retry, and twice as '
+             'long before each next one (default %default).'),
+
+    optparse.make_option(
+        '--retry-status',
+        metavar='codes',
+        dest='retry_status',
+        type='str',
+        default='500,502,503,504',
+        help='Comma separated HTTP status codes to retry '
+             '(default %default).'),
+
+    optparse.make_option(
+        '--retry-deadline',
+        metavar='sec',
+        dest='retry_deadline',
+        type='float',
+        default=0,
+        help="Don't retry a request more than <sec> seconds after it was "
+             "first made (default no limit)."),
+
     optparse.make_option(
         # The default version control system for editables, e.g. 'svn'
         '--default-vcs',
@@ -63,6 +63,61 @@ mirrors = make_option(
     default=[],
     help='Specific mirror URLs to query when --use-mirrors is used.')
 
+mirror_selection = make_option(
+    '--mirror-selection',
+    dest='mirror_selection',
+    type='choice',
+    choices=['all', 'fastest'],
+    default='all',
+    help='How to use the mirrors when --use-mirrors is used: search "all" '
+    'of them along with the main index, or fetch each page of the main '
+    'index from the "fastest" one that answers (default %default).')
+
+index_strategy = make_option(
+    '--index-strategy',
+    dest='index_strategy',
+    type='choice',
+    choices=['all', 'first-match', 'first-match-parallel'],
+    default='all',
+    help='Search "all" the indexes for a requirement, or only the first one, '
+    'by priority, that has a version of it that matches ("first-match"), '
+    'asking them one after the other or all at once '
+    '("first-match-parallel") (default %default).')
+
+index_cache = make_option(
+    '--index-cache',
+    dest='index_cache',
+    metavar='dir',
+    default=None,
+    help='Cache index pages in <dir> and revalidate them with conditional '
+    'requests instead of downloading them again.')
+
+index_cache_max_age = make_option(
+    '--index-cache-max-age',
+    dest='index_cache_max_age',
+    metavar='sec',
+    type='int',
+    default=600,
+    help='Reuse cached index pages younger than <sec> seconds without '
+    'revalidating them (default %default).')
+
+index_cache_size = make_option(
+    '--index-cache-size',
+    dest='index_cache_size',
+    metavar='MB',
+    type='int',
+    default=100,
+    help='Maximum size of the index page cache in megabytes (default %default).')
+
+resolve_workers = make_option(
+    '--resolve-workers',
+    dest='resolve_workers',
+    metavar='n',
+    type='int',
+    default=0,
+    help='Look requirements up on the package indexes with <n> background '
+    'threads as soon as their names are known, instead of one at a time.')
+
 requirements = make_option(
     '-r', '--requirement',
     dest='requirements',
@@ -85,6 +140,25 @@ download_cache = make_option(
     default=None,
     help='Cache downloaded packages in <dir>.')
 
+download_cache_size = make_option(
+    '--download-cache-size',
+    dest='download_cache_size',
+    metavar='MB',
+    type='int',
+    default=None,
+    help='Remove the least recently used packages from the download cache '
+    'once it grows larger than <MB> megabytes (default no limit).')
+
+download_workers = make_option(
+    '--download-workers',
+    dest='download_workers',
+    metavar='n',
+    type='int',
+    default=0,
+    help='Download the archives of the requirements known so far on up to '
+    '<n> threads in the background, instead of one by one as they are '
+    'unpacked (default %default).')
+
 no_deps = make_option(
     '--no-deps', '--no-dependencies',
     dest='ignore_dependencies',
@@ -138,6 +212,12 @@ index_group = {
         no_index,
         find_links,
         use_mirrors,
-        mirrors
+        mirrors,
+        mirror_selection,
+        index_strategy,
+        index_cache,
+        index_cache_max_age,
+        index_cache_size,
+        resolve_workers,
         ]
     }
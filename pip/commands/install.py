@@ -70,6 +70,8 @@ class InstallCommand(Command):
             help="Download packages into <dir> instead of installing them, regardless of what's already installed.")
 
         cmd_opts.add_option(cmdoptions.download_cache)
+        cmd_opts.add_option(cmdoptions.download_cache_size)
+        cmd_opts.add_option(cmdoptions.download_workers)
 
         cmd_opts.add_option(
             '--src', '--source', '--source-dir', '--source-directory',
@@ -162,7 +164,13 @@ class InstallCommand(Command):
                              index_urls=index_urls,
                              use_mirrors=options.use_mirrors,
                              mirrors=options.mirrors,
-                             use_wheel=options.use_wheel)
+                             use_wheel=options.use_wheel,
+                             index_cache=options.index_cache,
+                             index_cache_max_age=options.index_cache_max_age,
+                             index_cache_size=options.index_cache_size,
+                             resolve_workers=options.resolve_workers,
+                             mirror_selection=options.mirror_selection,
+                             index_strategy=options.index_strategy)
 
     def run(self, options, args):
         if options.download_dir:
@@ -198,6 +206,7 @@ class InstallCommand(Command):
             src_dir=options.src_dir,
             download_dir=options.download_dir,
             download_cache=options.download_cache,
+            download_cache_size=options.download_cache_size,
             upgrade=options.upgrade,
             as_egg=options.as_egg,
             ignore_installed=options.ignore_installed,
@@ -205,7 +214,8 @@ class InstallCommand(Command):
             force_reinstall=options.force_reinstall,
             use_user_site=options.use_user_site,
             target_dir=temp_target_dir,
-            skip_reqs=install_skip_reqs)
+            skip_reqs=install_skip_reqs,
+            download_workers=options.download_workers)
         for name in args:
             requirement_set.add_requirement(
                 InstallRequirement.from_line(name, None, prereleases=options.pre))
@@ -255,6 +265,8 @@ class InstallCommand(Command):
                 requirement_set.create_bundle(self.bundle_filename)
                 logger.notify('Created bundle in %s' % self.bundle_filename)
         finally:
+            requirement_set.shutdown()
+            finder.shutdown()
             # Clean up
             if (not options.no_clean) and ((not options.no_install) or options.download_dir):
                 requirement_set.cleanup_files(bundle=self.bundle)
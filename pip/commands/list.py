@@ -52,7 +52,13 @@ class ListCommand(Command):
         return PackageFinder(find_links=options.find_links,
                              index_urls=index_urls,
                              use_mirrors=options.use_mirrors,
-                             mirrors=options.mirrors)
+                             mirrors=options.mirrors,
+                             index_cache=options.index_cache,
+                             index_cache_max_age=options.index_cache_max_age,
+                             index_cache_size=options.index_cache_size,
+                             resolve_workers=options.resolve_workers,
+                             mirror_selection=options.mirror_selection,
+                             index_strategy=options.index_strategy)
 
     def run(self, options, args):
         if options.outdated:
@@ -87,25 +93,31 @@ class ListCommand(Command):
         finder.add_dependency_links(dependency_links)
 
         installed_packages = get_installed_distributions(local_only=options.local, include_editables=False)
-        for dist in installed_packages:
-            req = InstallRequirement.from_line(dist.key, None)
-            try:
-                link = finder.find_requirement(req, True)
-
-                # If link is None, means installed version is most up-to-date
-                if link is None:
+        reqs = [InstallRequirement.from_line(dist.key, None)
+                for dist in installed_packages]
+        try:
+            for req in reqs:
+                finder.prefetch_requirement(req)
+            for dist, req in zip(installed_packages, reqs):
+                try:
+                    link = finder.find_requirement(req, True)
+
+                    # If link is None, means installed version is most up-to-date
+                    if link is None:
+                        continue
+                except DistributionNotFound:
                     continue
-            except DistributionNotFound:
-                continue
-            except BestVersionAlreadyInstalled:
-                remote_version = req.installed_version
-            else:
-                # It might be a good idea that link or finder had a public method
-                # that returned version
-                remote_version = finder._link_package_versions(link, req.name)[0]
-                remote_version_raw = remote_version[2]
-                remote_version_parsed = remote_version[0]
-            yield dist, remote_version_raw, remote_version_parsed
+                except BestVersionAlreadyInstalled:
+                    remote_version = req.installed_version
+                else:
+                    # It might be a good idea that link or finder had a public method
+                    # that returned version
+                    remote_version = finder._link_package_versions(link, req.name)[0]
+                    remote_version_raw = remote_version[2]
+                    remote_version_parsed = remote_version[0]
+                yield dist, remote_version_raw, remote_version_parsed
+        finally:
+            finder.shutdown()
 
     def run_listing(self, options):
         installed_packages = get_installed_distributions(local_only=options.local)
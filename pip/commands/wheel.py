@@ -58,6 +58,8 @@ class WheelCommand(Command):
             help="Extra arguments to be supplied to 'setup.py bdist_wheel'.")
         cmd_opts.add_option(cmdoptions.requirements)
         cmd_opts.add_option(cmdoptions.download_cache)
+        cmd_opts.add_option(cmdoptions.download_cache_size)
+        cmd_opts.add_option(cmdoptions.download_workers)
         cmd_opts.add_option(cmdoptions.no_deps)
         cmd_opts.add_option(cmdoptions.build_dir)
 
@@ -95,7 +97,13 @@ class WheelCommand(Command):
                                index_urls=index_urls,
                                use_mirrors=options.use_mirrors,
                                mirrors=options.mirrors,
-                               use_wheel=options.use_wheel)
+                               use_wheel=options.use_wheel,
+                               index_cache=options.index_cache,
+                               index_cache_max_age=options.index_cache_max_age,
+                               index_cache_size=options.index_cache_size,
+                               resolve_workers=options.resolve_workers,
+                               mirror_selection=options.mirror_selection,
+                               index_strategy=options.index_strategy)
 
         options.build_dir = os.path.abspath(options.build_dir)
         requirement_set = RequirementSet(
@@ -103,9 +111,11 @@ class WheelCommand(Command):
             src_dir=None,
             download_dir=None,
             download_cache=options.download_cache,
+            download_cache_size=options.download_cache_size,
             ignore_dependencies=options.ignore_dependencies,
             ignore_installed=True,
-            skip_reqs=wheel_skip_reqs)
+            skip_reqs=wheel_skip_reqs,
+            download_workers=options.download_workers)
 
         #parse args and/or requirements files
         for name in args:
@@ -141,6 +151,8 @@ class WheelCommand(Command):
                 )
             wb.build()
         finally:
+            requirement_set.shutdown()
+            finder.shutdown()
             if not options.no_clean:
                 requirement_set.cleanup_files()
 
@@ -1,28 +1,41 @@
 import cgi
+import errno
 import getpass
 import hashlib
+import json
 import mimetypes
 import os
 import platform
+import random
 import re
 import shutil
 import socket
 import ssl
 import sys
 import tempfile
+import time
+
+try:
+    import threading
+except ImportError:
+    import dummy_threading as threading
 
 import pip
 
 from pip.backwardcompat import (xmlrpclib, urllib, urllib2, httplib,
                                 urlparse, string_types, get_http_message_param,
-                                match_hostname, CertificateError)
+                                match_hostname, CertificateError,
+                                get_request_host, get_request_selector,
+                                get_request_data, wrap_http_response)
 from pip.exceptions import InstallationError, PipError
 from pip.util import (splitext, rmtree, format_size, display_path,
                       backup_dir, ask_path_exists, unpack_file,
-                      create_download_cache_folder, cache_download)
+                      create_download_cache_folder, atomic_write,
+                      read_chunks, copy_file, IO_BUFFER_SIZE)
 from pip.vcs import vcs
 from pip.log import logger
 from pip.locations import default_cert_path
+from pip.pool import FetchPool
 
 __all__ = ['get_file_content', 'urlopen',
            'is_url', 'url_to_path', 'path_to_url', 'path_to_url2',
@@ -101,6 +114,65 @@ def get_file_content(url, comes_from=None):
 _scheme_re = re.compile(r'^(http|https|file):', re.I)
 _url_slash_drive_re = re.compile(r'/*([a-z])\|', re.I)
 
+class TLSContexts(object):
+    """
+    The SSL contexts of the process, one per CA bundle (and client
+    certificate), so that each bundle is loaded and parsed only once, and
+    the TLS sessions last negotiated with each server, so that new
+    connections to it can resume them instead of doing a full handshake.
+
+    ssl.SSLContext needs Python 2.7.9 or 3.2, and session resumption
+    Python 3.6; older Pythons fall back to ssl.wrap_socket() for every
+    connection.
+    """
+
+    max_sessions = 100
+
+    def __init__(self):
+        self._contexts = {}
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def get_context(self, cert_path, key_file=None, cert_file=None):
+        """Return the context verifying servers against `cert_path`, or None
+        if this Python has no ssl.SSLContext."""
+        if not hasattr(ssl, 'SSLContext'):
+            return None
+        key = (cert_path, key_file, cert_file)
+        self._lock.acquire()
+        try:
+            context = self._contexts.get(key)
+            if context is None:
+                context = ssl.SSLContext(ssl.PROTOCOL_SSLv23)
+                context.verify_mode = ssl.CERT_REQUIRED
+                context.load_verify_locations(cert_path)
+                if cert_file:
+                    context.load_cert_chain(cert_file, key_file)
+                self._contexts[key] = context
+            return context
+        finally:
+            self._lock.release()
+
+    def get_session(self, key):
+        return self._sessions.get(key)
+
+    def save_session(self, key, sock):
+        """Remember the session of the SSL socket `sock` for resuming it."""
+        session = getattr(sock, 'session', None)
+        if session is None:
+            return
+        self._lock.acquire()
+        try:
+            if key not in self._sessions and len(self._sessions) >= self.max_sessions:
+                self._sessions.clear()
+            self._sessions[key] = session
+        finally:
+            self._lock.release()
+
+
+tls_contexts = TLSContexts()
+
+
 class VerifiedHTTPSConnection(httplib.HTTPSConnection):
     """
     A connection that wraps connections with ssl certificate verification.
@@ -129,11 +201,23 @@ class VerifiedHTTPSConnection(httplib.HTTPSConnection):
         # get alternate bundle or use our included bundle
         cert_path = os.environ.get('PIP_CERT', '') or default_cert_path
 
-        self.sock = ssl.wrap_socket(sock,
-                                self.key_file,
-                                self.cert_file,
-                                cert_reqs=ssl.CERT_REQUIRED,
-                                ca_certs=cert_path)
+        context = tls_contexts.get_context(cert_path, self.key_file, self.cert_file)
+        if context is None:
+            self.sock = ssl.wrap_socket(sock,
+                                    self.key_file,
+                                    self.cert_file,
+                                    cert_reqs=ssl.CERT_REQUIRED,
+                                    ca_certs=cert_path)
+        else:
+            server_name = getattr(self, '_tunnel_host', None) or self.host
+            self._session_key = (server_name, self.port, cert_path)
+            kwargs = {}
+            if getattr(ssl, 'HAS_SNI', False):
+                kwargs['server_hostname'] = server_name
+            session = tls_contexts.get_session(self._session_key)
+            if session is not None:
+                kwargs['session'] = session
+            self.sock = context.wrap_socket(sock, **kwargs)
 
         try:
             match_hostname(self.sock.getpeercert(), self.host)
@@ -141,17 +225,248 @@ class VerifiedHTTPSConnection(httplib.HTTPSConnection):
             self.sock.shutdown(socket.SHUT_RDWR)
             self.sock.close()
             raise
+        self._save_session()
+
+    def _save_session(self):
+        key = getattr(self, '_session_key', None)
+        if key is not None and self.sock is not None:
+            tls_contexts.save_session(key, self.sock)
+
+    def close(self):
+        # Servers using TLS 1.3 only send their session tickets after the
+        # handshake, so the session is saved again once it is done with
+        self._save_session()
+        httplib.HTTPSConnection.close(self)
+
+
+class PooledHTTPResponse(httplib.HTTPResponse):
+    """
+    A response that hands its connection back to the ConnectionPool once
+    the body has been read completely, so the next request to the same
+    host can reuse it.
+    """
+    _pool = None
+    _pool_key = None
+    _connection = None
+
+    def read(self, amt=None):
+        data = httplib.HTTPResponse.read(self, amt)
+        if self.fp is None:
+            # httplib closes the response when it reaches the end of the body
+            self._release(reusable=True)
+        return data
+
+    if hasattr(httplib.HTTPResponse, 'readinto'):
+        # Python 3, where downloads read into a buffer
+        def readinto(self, b):
+            read = httplib.HTTPResponse.readinto(self, b)
+            if self.fp is None:
+                self._release(reusable=True)
+            return read
+
+    def close(self):
+        # Nothing left to read means the connection is in a clean state
+        reusable = self.length == 0
+        httplib.HTTPResponse.close(self)
+        self._release(reusable)
+
+    def _release(self, reusable):
+        conn, self._connection = self._connection, None
+        if conn is None:
+            return
+        if reusable and not self.will_close:
+            self._pool.put(self._pool_key, conn)
+        else:
+            conn.close()
+        self._pool.release(self._pool_key)
+
+
+class ConnectionPool(object):
+    """
+    Keep-alive HTTP(S) connections, shared by all requests made through
+    pip's URLOpener.  At most `max_per_host` connections to each host are
+    in use at a time: further requests to it wait for one of them to be
+    done with.  As many are kept idle for each host once done with, and
+    connections idle for longer than `idle_timeout` seconds are closed
+    instead of being reused.
+
+    A request that has waited `acquire_timeout` seconds for a connection
+    opens one anyway, so that a response that is never closed can't hold
+    up its host for good.
+    """
+
+    acquire_timeout = 60
+
+    def __init__(self, max_per_host=4, idle_timeout=30):
+        self.max_per_host = max_per_host
+        self.idle_timeout = idle_timeout
+        self._idle = {}
+        self._in_use = {}
+        self._lock = threading.Lock()
+        self._released = threading.Condition(self._lock)
+
+    def acquire(self, key):
+        """Wait until a connection for `key` may be used, and count it as
+        in use until release()."""
+        deadline = time.time() + self.acquire_timeout
+        self._lock.acquire()
+        try:
+            while self._in_use.get(key, 0) >= self.max_per_host:
+                timeout = deadline - time.time()
+                if timeout <= 0:
+                    logger.debug('Waited %ss for a connection to %s, opening '
+                                 'one more' % (self.acquire_timeout, key[1]))
+                    break
+                self._released.wait(timeout)
+            self._in_use[key] = self._in_use.get(key, 0) + 1
+        finally:
+            self._lock.release()
+
+    def release(self, key):
+        """Stop counting a connection for `key` as in use."""
+        self._lock.acquire()
+        try:
+            in_use = self._in_use.get(key, 0) - 1
+            if in_use > 0:
+                self._in_use[key] = in_use
+            else:
+                self._in_use.pop(key, None)
+            self._released.notify()
+        finally:
+            self._lock.release()
+
+    def get(self, key):
+        """Return an idle connection for `key`, or None."""
+        now = time.time()
+        self._lock.acquire()
+        try:
+            idle = self._idle.get(key, [])
+            while idle:
+                conn, released = idle.pop()
+                if now - released < self.idle_timeout:
+                    return conn
+                conn.close()
+        finally:
+            self._lock.release()
+        return None
+
+    def put(self, key, conn):
+        """Keep `conn` for reuse, unless the host has enough idle ones."""
+        self._lock.acquire()
+        try:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_per_host:
+                idle.append((conn, time.time()))
+                return
+        finally:
+            self._lock.release()
+        conn.close()
+
+    def clear(self):
+        """Close all idle connections."""
+        self._lock.acquire()
+        try:
+            idle, self._idle = self._idle, {}
+        finally:
+            self._lock.release()
+        for conns in idle.values():
+            for conn, released in conns:
+                conn.close()
+
+    def open(self, http_class, req):
+        """
+        Like urllib2.AbstractHTTPHandler.do_open(), but sends the request
+        over an idle connection to the same host when there is one.
+        """
+        host = get_request_host(req)
+        if not host:
+            raise urllib2.URLError('no host given')
+
+        headers = dict(req.unredirected_hdrs)
+        headers.update(dict((k, v) for k, v in req.headers.items()
+                            if k not in headers))
+        headers = dict((name.title(), val) for name, val in headers.items())
+
+        tunnel_host = getattr(req, '_tunnel_host', None)
+        tunnel_headers = {}
+        if tunnel_host:
+            # The proxy credentials are for the CONNECT request only
+            if 'Proxy-Authorization' in headers:
+                tunnel_headers['Proxy-Authorization'] = headers.pop('Proxy-Authorization')
+
+        key = (http_class, host, tunnel_host)
+        self.acquire(key)
+        try:
+            conn = self.get(key)
+            while True:
+                reused = conn is not None
+                if conn is None:
+                    conn = http_class(host, timeout=req.timeout)
+                    if tunnel_host:
+                        set_tunnel = getattr(conn, 'set_tunnel', None) or conn._set_tunnel
+                        set_tunnel(tunnel_host, headers=tunnel_headers)
+                conn.response_class = PooledHTTPResponse
+                try:
+                    conn.request(req.get_method(), get_request_selector(req),
+                                 get_request_data(req), headers)
+                    response = conn.getresponse()
+                except (socket.error, httplib.HTTPException):
+                    e = sys.exc_info()[1]
+                    conn.close()
+                    if reused:
+                        # The server closed the idle connection, try a new one
+                        conn = None
+                        continue
+                    raise urllib2.URLError(e)
+                break
+        except:
+            self.release(key)
+            raise
 
+        response._pool = self
+        response._pool_key = key
+        response._connection = conn
+        return wrap_http_response(response, req.get_full_url())
+
+
+def discard_response(response):
+    """
+    Read and close what is left of a short (error) response, so that its
+    connection can go back to the ConnectionPool.
+    """
+    if getattr(response, 'fp', None) is None:
+        return
+    try:
+        response.read()
+    except (IOError, socket.error, httplib.HTTPException):
+        pass
+    response.close()
+
+
+class PooledHTTPHandler(urllib2.HTTPHandler):
+    """
+    A HTTPHandler that reuses keep-alive connections from a ConnectionPool.
+    """
+    def __init__(self, pool):
+        self.pool = pool
+        urllib2.HTTPHandler.__init__(self)
+
+    def http_open(self, req):
+        return self.pool.open(httplib.HTTPConnection, req)
 
 
 class VerifiedHTTPSHandler(urllib2.HTTPSHandler):
     """
-    A HTTPSHandler that uses our own VerifiedHTTPSConnection.
+    A HTTPSHandler that uses our own VerifiedHTTPSConnection, reusing
+    keep-alive connections from `pool` if one is given.
     """
-    def __init__(self, connection_class = VerifiedHTTPSConnection):
+    def __init__(self, connection_class = VerifiedHTTPSConnection, pool=None):
         self.specialized_conn_class = connection_class
+        self.pool = pool
         urllib2.HTTPSHandler.__init__(self)
     def https_open(self, req):
+        if self.pool is not None:
+            return self.pool.open(self.specialized_conn_class, req)
         return self.do_open(self.specialized_conn_class, req)
 
 
@@ -162,6 +477,7 @@ class URLOpener(object):
     def __init__(self):
         self.passman = urllib2.HTTPPasswordMgrWithDefaultRealm()
         self.proxy_handler = None
+        self.pool = ConnectionPool()
 
     def __call__(self, url):
         """
@@ -173,11 +489,14 @@ class URLOpener(object):
         url, username, password, scheme = self.extract_credentials(url)
         if username is None:
             try:
-                response = self.get_opener(scheme=scheme).open(url)
+                response = self.get_opener(scheme=scheme).open(
+                    self.get_request(url))
             except urllib2.HTTPError:
                 e = sys.exc_info()[1]
                 if e.code != 401:
                     raise
+                # Its connection is free for the request with credentials
+                discard_response(e)
                 response = self.get_response(url)
         else:
             response = self.get_response(url, username, password)
@@ -197,8 +516,8 @@ class URLOpener(object):
         does the dirty work of actually getting the rsponse object using urllib2
         and its HTTP auth builtins.
         """
-        scheme, netloc, path, query, frag = urlparse.urlsplit(url)
         req = self.get_request(url)
+        scheme, netloc, path, query, frag = urlparse.urlsplit(req.get_full_url())
 
         stored_username, stored_password = self.passman.find_user_password(None, netloc)
         # see if we have a password stored
@@ -224,14 +543,14 @@ class URLOpener(object):
             args.extend([self.proxy_handler, urllib2.CacheFTPHandler])
 
         if kwargs.get('scheme') == 'https':
-            https_handler = VerifiedHTTPSHandler()
+            https_handler = VerifiedHTTPSHandler(pool=self.pool)
             director = urllib2.build_opener(https_handler, *args)
             #strip out HTTPHandler to prevent MITM spoof
             for handler in director.handlers:
                 if isinstance(handler, urllib2.HTTPHandler):
                     director.handlers.remove(handler)
         else:
-            director = urllib2.build_opener(*args)
+            director = urllib2.build_opener(PooledHTTPHandler(self.pool), *args)
 
         # Add our new headers to the opener
         headers = [x for x in director.addheaders if x[0].lower() != "user-agent"]
@@ -261,10 +580,11 @@ class URLOpener(object):
 
     def extract_credentials(self, url):
         """
-        Extracts user/password from a url.
+        Extracts user/password from a url, or the url of a request.
 
         Returns a tuple:
-            (url-without-auth, username, password)
+            (url-without-auth, username, password, scheme)
+        where a request is returned as a copy with the new url.
         """
         if isinstance(url, urllib2.Request):
             result = urlparse.urlsplit(url.get_full_url())
@@ -286,6 +606,9 @@ class URLOpener(object):
             netloc = netloc.replace('%s:%s@' % (username, password), '', 1)
 
         target_url = urlparse.urlunsplit((scheme, netloc, path, query, frag))
+        if isinstance(url, urllib2.Request):
+            target_url = url.__class__(target_url, get_request_data(url),
+                                       dict(url.header_items()))
         return target_url, username, password, scheme
 
     def get_proxy(self, proxystr=''):
@@ -314,6 +637,100 @@ class URLOpener(object):
 urlopen = URLOpener()
 
 
+class RetryPolicy(object):
+    """
+    When and how often to try a request again after a transient error: a
+    connection that failed or timed out, or an HTTP error whose status is
+    in `statuses`.
+
+    Each retry waits twice as long as the one before, from `backoff`
+    seconds, with random jitter so that concurrent requests don't retry
+    together, or as long as the server asks for with Retry-After.  No
+    retry is started that would end more than `deadline` seconds after the
+    first attempt started.
+    """
+
+    connection_errnos = frozenset([
+        getattr(errno, name) for name in (
+            'ECONNRESET', 'ECONNREFUSED', 'ECONNABORTED', 'ETIMEDOUT',
+            'EPIPE', 'EHOSTUNREACH', 'ENETUNREACH', 'ENETDOWN')
+        if hasattr(errno, name)])
+
+    def __init__(self, retries=0, backoff=0.5, statuses=(500, 502, 503, 504),
+                 deadline=None):
+        self.setup(retries, backoff, statuses, deadline)
+
+    def setup(self, retries=0, backoff=0.5, statuses=(500, 502, 503, 504),
+              deadline=None):
+        """Configure the policy; `statuses` may be a comma separated
+        string, as given on the command line."""
+        if isinstance(statuses, string_types):
+            codes = []
+            for status in statuses.split(','):
+                status = status.strip()
+                if status.isdigit():
+                    codes.append(int(status))
+                elif status:
+                    logger.warn('Ignoring invalid HTTP status %r to retry' % status)
+            statuses = codes
+        self.retries = retries or 0
+        self.backoff = backoff
+        self.statuses = frozenset(statuses)
+        self.deadline = deadline or None
+
+    def is_transient(self, e):
+        """Whether the exception `e` may not happen again."""
+        if isinstance(e, urllib2.HTTPError):
+            return e.code in self.statuses
+        if isinstance(e, urllib2.URLError):
+            reason = getattr(e, 'reason', None)
+            return not isinstance(reason, (ssl.SSLError, CertificateError))
+        if isinstance(e, (socket.timeout, httplib.HTTPException)):
+            return True
+        if isinstance(e, (socket.error, EnvironmentError)):
+            return e.errno in self.connection_errnos
+        return False
+
+    def delay(self, attempt, started, e):
+        """Return how long to wait before trying again after the exception
+        `e` ended the `attempt`th attempt (from 0) of a request started at
+        `started`, or None if it shouldn't be tried again."""
+        if attempt >= self.retries or not self.is_transient(e):
+            return None
+        delay = self.backoff * 2 ** attempt
+        delay = random.uniform(delay / 2, delay)
+        headers = getattr(e, 'hdrs', None)
+        retry_after = headers is not None and headers.get('Retry-After')
+        if retry_after and retry_after.strip().isdigit():
+            delay = max(delay, int(retry_after))
+        if (self.deadline is not None
+                and time.time() + delay - started > self.deadline):
+            return None
+        return delay
+
+    def call(self, func, *args, **kwargs):
+        """Return func(*args, **kwargs), calling it again after transient
+        errors as long as the policy allows."""
+        started = time.time()
+        attempt = 0
+        while True:
+            try:
+                return func(*args, **kwargs)
+            except (IOError, OSError, socket.error, httplib.HTTPException):
+                e = sys.exc_info()[1]
+                delay = self.delay(attempt, started, e)
+                if delay is None:
+                    raise
+            if isinstance(e, urllib2.HTTPError):
+                discard_response(e)
+            logger.notify('Retrying in %.1f seconds after error: %s'
+                          % (delay, e))
+            time.sleep(delay)
+            attempt += 1
+
+retry_policy = RetryPolicy()
+
+
 def is_url(name):
     """Returns true if the name looks like a URL"""
     if ':' not in name:
@@ -456,62 +873,189 @@ def _get_hash_from_file(target_file, link):
         return None
 
     fp = open(target_file, 'rb')
-    while True:
-        chunk = fp.read(4096)
-        if not chunk:
-            break
-        download_hash.update(chunk)
-    fp.close()
+    try:
+        for chunk in read_chunks(fp):
+            download_hash.update(chunk)
+    finally:
+        fp.close()
     return download_hash
 
 
-def _download_url(resp, link, temp_location):
-    fp = open(temp_location, 'wb')
-    download_hash = None
-    if link.hash and link.hash_name:
+def _response_chunks(resp):
+    """Yield the body of `resp` in chunks sized to the connection: from
+    64 KB, growing up to IO_BUFFER_SIZE while they arrive quickly and
+    shrinking again when they don't, so that slow downloads still show
+    their progress.  Chunks may be memoryviews of a reused buffer, like
+    those of read_chunks()."""
+    size = min_size = 64 * 1024
+    readinto = getattr(resp, 'readinto', None)
+    try:
+        view = memoryview(bytearray(IO_BUFFER_SIZE))
+    except NameError:
+        # Python 2.6
+        readinto = None
+    while True:
+        start = time.time()
+        if readinto is not None:
+            read = readinto(view[:size])
+            chunk = view[:read]
+        else:
+            chunk = resp.read(size)
+            read = len(chunk)
+        if not read:
+            break
+        elapsed = time.time() - start
+        yield chunk
+        if read == size and elapsed < 0.1 and size < IO_BUFFER_SIZE:
+            size *= 2
+        elif elapsed > 0.5 and size > min_size:
+            size //= 2
+
+
+def _download_url(resp, link, temp_location, quiet=False, offset=0,
+                  hash_names=()):
+    """Write the body of `resp` to `temp_location`, after the first `offset`
+    bytes already there if `resp` is the rest of a partial download.
+
+    Return the hashes of the file computed on the way, by name: that of
+    `link`, if it has one, and those named in `hash_names`.  A body shorter
+    than its Content-Length raises httplib.IncompleteRead, which is
+    transient: what was written is kept to be resumed.
+    """
+    hashes = {}
+    for hash_name in hash_names:
+        hashes[hash_name] = hashlib.new(hash_name)
+    if link.hash and link.hash_name and link.hash_name not in hashes:
         try:
-            download_hash = hashlib.new(link.hash_name)
+            hashes[link.hash_name] = hashlib.new(link.hash_name)
         except ValueError:
             logger.warn("Unsupported hash name %s for package %s" % (link.hash_name, link))
+    if offset:
+        if hashes:
+            fp = open(temp_location, 'rb')
+            try:
+                for chunk in read_chunks(fp):
+                    for download_hash in hashes.values():
+                        download_hash.update(chunk)
+            finally:
+                fp.close()
+        fp = open(temp_location, 'ab')
+    else:
+        fp = open(temp_location, 'wb')
     try:
-        total_length = int(resp.info()['content-length'])
+        total_length = int(resp.info()['content-length']) + offset
     except (ValueError, KeyError, TypeError):
         total_length = 0
-    downloaded = 0
-    show_progress = total_length > 40 * 1000 or not total_length
+    progress = None
     show_url = link.show_url
     try:
-        if show_progress:
+        if not quiet and (total_length > 40 * 1000 or not total_length):
             ## FIXME: the URL can get really long in this message:
-            if total_length:
-                logger.start_progress('Downloading %s (%s): ' % (show_url, format_size(total_length)))
+            if offset:
+                message = 'Resuming download of %s (%s): ' % (show_url, format_size(total_length))
+            elif total_length:
+                message = 'Downloading %s (%s): ' % (show_url, format_size(total_length))
             else:
-                logger.start_progress('Downloading %s (unknown size): ' % show_url)
-        else:
+                message = 'Downloading %s (unknown size): ' % show_url
+            progress = DownloadProgress(message, total_length, offset)
+            if not progress.start():
+                progress = None
+        elif not quiet:
             logger.notify('Downloading %s' % show_url)
         logger.info('Downloading from URL %s' % link)
-
-        while True:
-            chunk = resp.read(4096)
-            if not chunk:
-                break
-            downloaded += len(chunk)
-            if show_progress:
-                if not total_length:
-                    logger.show_progress('%s' % format_size(downloaded))
-                else:
-                    logger.show_progress('%3i%%  %s' % (100 * downloaded / total_length, format_size(downloaded)))
-            if download_hash is not None:
+        if offset:
+            logger.info('Resuming after the first %s' % format_size(offset))
+
+        received = offset
+        for chunk in _response_chunks(resp):
+            if progress is not None:
+                progress.update(len(chunk))
+            for download_hash in hashes.values():
                 download_hash.update(chunk)
             fp.write(chunk)
-        fp.close()
+            received += len(chunk)
+        if received < total_length:
+            # The connection was closed in the middle of the body
+            raise httplib.IncompleteRead(''.encode(), total_length - received)
     finally:
-        if show_progress:
-            logger.end_progress('%s downloaded' % format_size(downloaded))
-    return download_hash
+        fp.close()
+        if progress is not None:
+            progress.finish()
+    return hashes
+
 
+class DownloadProgress(object):
+    """
+    Shows the progress of a download on the current line, with its speed
+    and the time left, redrawn at most `max_redraws` times a second.
+
+    Only one download shows its progress at a time, so that concurrent
+    downloads don't write over each other, and only on a terminal.
+    """
+
+    _lock = threading.Lock()
+    _current = None
+
+    def __init__(self, message, total_length=0, downloaded=0, max_redraws=10):
+        self.message = message
+        self.total_length = total_length
+        self.downloaded = self._start_downloaded = downloaded
+        self.interval = 1.0 / max_redraws
+        self._start_time = self._last_redraw = None
+
+    def start(self):
+        """Start showing the progress; return whether it is shown, which
+        it isn't while another download's is, or if stdout isn't a
+        terminal."""
+        if not logger._show_progress():
+            return False
+        cls = DownloadProgress
+        cls._lock.acquire()
+        try:
+            if cls._current is not None:
+                return False
+            cls._current = self
+        finally:
+            cls._lock.release()
+        self._start_time = self._last_redraw = time.time()
+        logger.start_progress(self.message)
+        return True
 
-def _copy_file(filename, location, content_type, link):
+    def update(self, length):
+        """Account for `length` more bytes downloaded."""
+        self.downloaded += length
+        now = time.time()
+        if now - self._last_redraw >= self.interval:
+            self._last_redraw = now
+            logger.show_progress(self.status(now))
+
+    def status(self, now):
+        downloaded = self.downloaded
+        if self.total_length:
+            status = '%3i%%  %s' % (100 * downloaded / self.total_length,
+                                    format_size(downloaded))
+        else:
+            status = format_size(downloaded)
+        elapsed = now - self._start_time
+        speed = elapsed and (downloaded - self._start_downloaded) / elapsed
+        if speed:
+            status += '  %s/s' % format_size(speed)
+            if self.total_length > downloaded:
+                left = int((self.total_length - downloaded) / speed)
+                status += '  %d:%02d left' % (left // 60, left % 60)
+        return status
+
+    def finish(self):
+        logger.end_progress('%s downloaded' % format_size(self.downloaded))
+        cls = DownloadProgress
+        cls._lock.acquire()
+        try:
+            cls._current = None
+        finally:
+            cls._lock.release()
+
+
+def _copy_file(filename, location, content_type, link, hardlink=False):
     copy = True
     download_location = os.path.join(location, link.filename)
     if os.path.exists(download_location):
@@ -529,21 +1073,21 @@ def _copy_file(filename, location, content_type, link):
                         % (display_path(download_location), display_path(dest_file)))
             shutil.move(download_location, dest_file)
     if copy:
-        shutil.copy(filename, download_location)
+        copy_file(filename, download_location, hardlink)
         logger.indent -= 2
         logger.notify('Saved %s' % display_path(download_location))
 
 
-def unpack_http_url(link, location, download_cache, download_dir=None):
+def unpack_http_url(link, location, download_cache, download_dir=None,
+                    downloader=None, mirror_links=()):
+    """Download `link`, or one of its `mirror_links` if it can't be, and
+    unpack it into `location`."""
     temp_dir = tempfile.mkdtemp('-unpack', 'pip-')
     target_url = link.url.split('#', 1)[0]
-    target_file = None
     download_hash = None
-    if download_cache:
-        target_file = os.path.join(download_cache,
-                                   urllib.quote(target_url, ''))
-        if not os.path.isdir(download_cache):
-            create_download_cache_folder(download_cache)
+    hashes = {}
+    if download_cache and not isinstance(download_cache, DownloadCache):
+        download_cache = DownloadCache(download_cache)
 
     already_downloaded = None
     if download_dir:
@@ -551,69 +1095,581 @@ def unpack_http_url(link, location, download_cache, download_dir=None):
         if not os.path.exists(already_downloaded):
             already_downloaded = None
 
-    if (target_file
-        and os.path.exists(target_file)
-        and os.path.exists(target_file + '.content-type')):
-        fp = open(target_file+'.content-type')
-        content_type = fp.read().strip()
-        fp.close()
+    hash_verified = False
+    cached = download_cache and download_cache.lookup(target_url)
+    if cached:
+        temp_location, content_type = cached
         if link.hash and link.hash_name:
-            download_hash = _get_hash_from_file(target_file, link)
-        temp_location = target_file
-        logger.notify('Using download cache from %s' % target_file)
+            if download_cache.get_hash(target_url, link.hash_name) == link.hash:
+                hash_verified = True
+            else:
+                download_hash = _get_hash_from_file(temp_location, link)
+        logger.notify('Using download cache from %s' % temp_location)
     elif already_downloaded:
         temp_location = already_downloaded
-        content_type = mimetypes.guess_type(already_downloaded)
+        content_type = mimetypes.guess_type(already_downloaded)[0]
         if link.hash:
             download_hash = _get_hash_from_file(temp_location, link)
+            if download_hash is not None:
+                hashes[link.hash_name] = download_hash
         logger.notify('File was already downloaded %s' % already_downloaded)
     else:
-        resp = _get_response_from_url(target_url, link)
-        content_type = resp.info().get('content-type', '')
-        filename = link.filename  # fallback
-        # Have a look at the Content-Disposition header for a better guess
-        content_disposition = resp.info().get('content-disposition')
-        if content_disposition:
-            type, params = cgi.parse_header(content_disposition)
-            # We use ``or`` here because we don't want to use an "empty" value
-            # from the filename param.
-            filename = params.get('filename') or filename
-        ext = splitext(filename)[1]
-        if not ext:
-            ext = mimetypes.guess_extension(content_type)
-            if ext:
-                filename += ext
-        if not ext and link.url != geturl(resp):
-            ext = os.path.splitext(geturl(resp))[1]
-            if ext:
-                filename += ext
-        temp_location = os.path.join(temp_dir, filename)
-        download_hash = _download_url(resp, link, temp_location)
-    if link.hash and link.hash_name:
-        _check_hash(download_hash, link)
-    if download_dir and not already_downloaded:
-        _copy_file(temp_location, download_dir, content_type, link)
-    unpack_file(temp_location, location, content_type, link)
-    if target_file and target_file != temp_location:
-        cache_download(target_file, temp_location, content_type)
-    if target_file is None and not already_downloaded:
-        os.unlink(temp_location)
-    os.rmdir(temp_dir)
+        prefetched = downloader is not None and downloader.take(link)
+        if prefetched:
+            temp_location, content_type, hashes = prefetched
+            logger.notify('Downloaded %s in the background' % link.show_url)
+        else:
+            temp_location, content_type, hashes = _download_with_failover(
+                [link] + list(mirror_links), temp_dir, download_cache)
+        download_hash = hashes.get(link.hash_name)
+    try:
+        if link.hash and link.hash_name and not hash_verified:
+            _check_hash(download_hash, link)
+            if cached:
+                download_cache.add_hash(target_url, link.hash_name,
+                                        download_hash.hexdigest())
+        if download_dir and not already_downloaded:
+            # The temporary copy of a download can be linked to, unless
+            # it goes into the cache
+            _copy_file(temp_location, download_dir, content_type, link,
+                       hardlink=not cached and not download_cache)
+        unpack_file(temp_location, location, content_type, link)
+        if download_cache and not cached:
+            # Only this run's downloads are moved, not the user's files
+            download_cache.store(target_url, temp_location, content_type,
+                                 hashes, move=not already_downloaded)
+    finally:
+        if (not cached and not already_downloaded
+                and os.path.exists(temp_location)):
+            os.unlink(temp_location)
+        os.rmdir(temp_dir)
 
 
-def _get_response_from_url(target_url, link):
+class DownloadCache(object):
+    """
+    The --download-cache directory: downloaded archives stored by the
+    sha256 digest of their content, so an archive reachable from several
+    URLs (mirrors, redirects) is only kept once, and an index mapping each
+    URL to its archive and content type.
+
+    Files are written under a temporary name and renamed into place, so
+    several pip processes can share the cache.  Once the archives add up
+    to more than `max_size` megabytes, the least recently used ones are
+    removed.
+
+    Archives cached by earlier versions of pip, stored under their quoted
+    URL, are moved into the new layout the first time they are used.
+
+    Interrupted downloads are kept in the cache too, with the ETag or
+    Last-Modified header they were downloaded with, so that they can be
+    resumed later.
+
+    The index also records the digests of each archive that were computed
+    while downloading it or checked since, with its size and modification
+    time, so that its hash needn't be computed again while the archive is
+    unchanged.  The last use of an archive is its access time.
+    """
+
+    def __init__(self, path, max_size=None):
+        self.path = os.path.abspath(os.path.expanduser(path))
+        if max_size is not None:
+            max_size = max_size * 1000 * 1000
+        self.max_size = max_size
+        self.objects_dir = os.path.join(self.path, 'objects')
+        self.urls_dir = os.path.join(self.path, 'urls')
+        self.partial_dir = os.path.join(self.path, 'partial')
+
+    def _key(self, url):
+        return hashlib.sha1(url.encode('utf-8')).hexdigest()
+
+    def _entry_path(self, url):
+        return os.path.join(self.urls_dir, self._key(url) + '.json')
+
+    def _makedirs(self, path):
+        if not os.path.isdir(path):
+            try:
+                os.makedirs(path)
+            except OSError:
+                # Another process may just have created it
+                if not os.path.isdir(path):
+                    raise
+
+    def _read_entry(self, url):
+        try:
+            fp = open(self._entry_path(url))
+            try:
+                return json.load(fp)
+            finally:
+                fp.close()
+        except (IOError, OSError, ValueError):
+            return None
+
+    def _touch(self, path):
+        """Mark the archive at `path` as used, keeping its modification
+        time."""
+        st = os.stat(path)
+        if hasattr(st, 'st_mtime_ns'):
+            os.utime(path, ns=(int(time.time() * 1e9), st.st_mtime_ns))
+        else:
+            # Only kept to the microsecond (see _unchanged())
+            os.utime(path, (time.time(), st.st_mtime))
+
+    def _unchanged(self, st, entry):
+        """Whether the archive whose os.stat() is `st` still has the size
+        and modification time recorded in `entry`.  Times are compared to
+        the millisecond, which they keep through _touch() everywhere."""
+        mtime = entry.get('mtime')
+        return (st.st_size == entry.get('size') and mtime is not None
+                and abs(st.st_mtime - mtime) < 0.001)
+
+    def lookup(self, url):
+        """Return the (path, content type) of the archive cached for `url`,
+        or None."""
+        entry = self._read_entry(url)
+        if entry is None:
+            return self._import_legacy(url)
+        path = os.path.join(self.objects_dir, entry['object'])
+        try:
+            self._touch(path)
+        except OSError:
+            # Removed to make room
+            return None
+        return path, entry['content_type']
+
+    def get_hash(self, url, hash_name):
+        """Return the `hash_name` hex digest recorded for the archive cached
+        for `url`, or None if there is none or the archive has changed
+        since."""
+        entry = self._read_entry(url)
+        if entry is None or hash_name not in entry.get('hashes', {}):
+            return None
+        try:
+            st = os.stat(os.path.join(self.objects_dir, entry['object']))
+        except OSError:
+            return None
+        if not self._unchanged(st, entry):
+            return None
+        return entry['hashes'][hash_name]
+
+    def add_hash(self, url, hash_name, hexdigest):
+        """Record the `hash_name` hex digest of the archive cached for
+        `url`, once checked."""
+        entry = self._read_entry(url)
+        if entry is None:
+            return
+        try:
+            st = os.stat(os.path.join(self.objects_dir, entry['object']))
+        except OSError:
+            return
+        if not self._unchanged(st, entry):
+            entry['hashes'] = {}
+        entry.setdefault('hashes', {})[hash_name] = hexdigest
+        entry['size'], entry['mtime'] = st.st_size, st.st_mtime
+        atomic_write(self._entry_path(url), json.dumps(entry).encode('utf-8'))
+
+    def _import_legacy(self, url):
+        legacy_path = os.path.join(self.path, urllib.quote(url, ''))
+        try:
+            fp = open(legacy_path + '.content-type')
+            try:
+                content_type = fp.read().strip()
+            finally:
+                fp.close()
+        except IOError:
+            return None
+        if not os.path.exists(legacy_path):
+            return None
+        path = self.store(url, legacy_path, content_type, move=True)
+        try:
+            os.remove(legacy_path + '.content-type')
+        except OSError:
+            pass
+        return path, content_type
+
+    def store(self, url, filename, content_type, hashes=None, move=False):
+        """Copy the archive `filename`, downloaded from `url`, into the
+        cache, or move it there if `move` is true; return the path of the
+        cached copy.
+
+        `hashes` are the hashes of the archive computed while downloading
+        it, by name.  Its sha256 digest is computed here if they don't
+        include it.
+        """
+        if not os.path.isdir(self.path):
+            create_download_cache_folder(self.path)
+        self._makedirs(self.objects_dir)
+        self._makedirs(self.urls_dir)
+        hashes = dict(hashes or {})
+        fd, temp_path = tempfile.mkstemp(prefix='.tmp-', dir=self.objects_dir)
+        os.close(fd)
+        try:
+            moved = False
+            if move:
+                try:
+                    if sys.platform == 'win32':
+                        # os.rename() can't replace an existing file on Windows
+                        os.remove(temp_path)
+                    os.rename(filename, temp_path)
+                    moved = True
+                except OSError:
+                    # On another file system
+                    pass
+            if not moved:
+                digest = hashlib.sha256()
+                dest = open(temp_path, 'wb')
+                try:
+                    src = open(filename, 'rb')
+                    try:
+                        for chunk in read_chunks(src):
+                            digest.update(chunk)
+                            dest.write(chunk)
+                    finally:
+                        src.close()
+                finally:
+                    dest.close()
+                hashes['sha256'] = digest
+                if move:
+                    os.remove(filename)
+            elif 'sha256' not in hashes:
+                digest = hashlib.sha256()
+                fp = open(temp_path, 'rb')
+                try:
+                    for chunk in read_chunks(fp):
+                        digest.update(chunk)
+                finally:
+                    fp.close()
+                hashes['sha256'] = digest
+            digest = hashes['sha256'].hexdigest()
+            name = digest + splitext(filename)[1]
+            obj = os.path.join(digest[:2], name)
+            path = os.path.join(self.objects_dir, obj)
+            self._makedirs(os.path.dirname(path))
+            if os.path.exists(path):
+                # Already cached from another URL
+                os.remove(temp_path)
+                self._touch(path)
+            else:
+                try:
+                    os.rename(temp_path, path)
+                except OSError:
+                    # Stored by another process in the meantime (Windows)
+                    if not os.path.exists(path):
+                        raise
+                    os.remove(temp_path)
+            st = os.stat(path)
+        except:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        entry = {'url': url, 'object': obj, 'sha256': digest,
+                 'content_type': content_type,
+                 'hashes': dict((hash_name, h.hexdigest())
+                                for hash_name, h in hashes.items()),
+                 'size': st.st_size, 'mtime': st.st_mtime}
+        atomic_write(self._entry_path(url), json.dumps(entry).encode('utf-8'))
+        logger.notify('Storing download in cache at %s' % display_path(path))
+        self._prune(keep=path)
+        return path
+
+    def claim_partial(self, url):
+        """Take the partial download of `url` for ourselves, so no other
+        process writes to it at the same time.  Return its path, which is
+        an empty file if there was none, and the validator to resume it
+        with (see release_partial()), or None."""
+        if not os.path.isdir(self.path):
+            create_download_cache_folder(self.path)
+        self._makedirs(self.partial_dir)
+        partial = os.path.join(self.partial_dir, self._key(url))
+        fd, path = tempfile.mkstemp(prefix='.tmp-', dir=self.partial_dir)
+        os.close(fd)
+        validator = None
+        try:
+            if sys.platform == 'win32':
+                # os.rename() can't replace an existing file on Windows
+                os.remove(path)
+            os.rename(partial, path)
+        except OSError:
+            # No partial download, or another process has it
+            open(path, 'wb').close()
+        else:
+            try:
+                fp = open(partial + '.json')
+                try:
+                    entry = json.load(fp)
+                finally:
+                    fp.close()
+                if entry['url'] == url:
+                    validator = entry['validator']
+            except (IOError, OSError, ValueError, KeyError):
+                pass
+        return path, validator
+
+    def release_partial(self, url, path, validator):
+        """Keep what was downloaded of `url` in `path` for later, if
+        anything and if it can be resumed with `validator` (the ETag or
+        Last-Modified header of the response), or else remove it."""
+        partial = os.path.join(self.partial_dir, self._key(url))
+        if (validator and os.path.exists(path)
+                and os.path.getsize(path)):
+            entry = {'url': url, 'validator': validator}
+            atomic_write(partial + '.json', json.dumps(entry).encode('utf-8'))
+            if sys.platform == 'win32' and os.path.exists(partial):
+                os.remove(partial)
+            os.rename(path, partial)
+            logger.info('Kept partial download of %s in %s'
+                        % (url, display_path(partial)))
+        else:
+            for old in (path, partial + '.json'):
+                if os.path.exists(old):
+                    os.remove(old)
+
+    def _prune(self, keep=None):
+        """Remove the least recently used archives until the cache fits in
+        `max_size`."""
+        if self.max_size is None:
+            return
+        objects = []
+        total = 0
+        for subdir in os.listdir(self.objects_dir):
+            subdir = os.path.join(self.objects_dir, subdir)
+            if not os.path.isdir(subdir):
+                continue
+            for name in os.listdir(subdir):
+                path = os.path.join(subdir, name)
+                try:
+                    size = os.path.getsize(path)
+                    atime = os.path.getatime(path)
+                except OSError:
+                    continue
+                total += size
+                objects.append((atime, size, path))
+        if total <= self.max_size:
+            return
+        objects.sort()
+        for atime, size, path in objects:
+            if total <= self.max_size:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            logger.info('Removed %s from the download cache' % display_path(path))
+            total -= size
+
+
+def _download_http_url(link, temp_dir, quiet=False, download_cache=None):
+    """Download `link` into `temp_dir`; return the path of the file, its
+    content type and the hashes computed while downloading it (see
+    _download_url()).  `quiet` downloads don't show their progress.
+
+    With a `download_cache`, the file is downloaded into it instead, so
+    that it can be resumed from there if the download is interrupted, and
+    then moved into the cache without copying it.  Its sha256 digest is
+    computed on the way.
+    """
+    target_url = link.url.split('#', 1)[0]
+    partial = None
+    if (download_cache
+            and urlparse.urlsplit(target_url)[0] in ('http', 'https')):
+        partial, validator = download_cache.claim_partial(target_url)
     try:
-        resp = urlopen(target_url)
-    except urllib2.HTTPError:
-        e = sys.exc_info()[1]
-        logger.fatal("HTTP error %s while getting %s" % (e.code, link))
+        resp = None
+        if partial and validator and os.path.getsize(partial):
+            resp, offset = _get_range_response(
+                target_url, os.path.getsize(partial), validator)
+        if resp is None:
+            offset = 0
+            resp = _get_response_from_url(target_url, link)
+        validator = _get_range_validator(resp)
+        content_type, filename = _get_download_filename(resp, link)
+        if partial:
+            hashes = _download_url(resp, link, partial, quiet, offset,
+                                   ('sha256',))
+            # Keep it next to the cache, to be moved into it
+            temp_location = partial + splitext(filename)[1]
+            os.rename(partial, temp_location)
+        else:
+            temp_location = os.path.join(temp_dir, filename)
+            hashes = _download_url(resp, link, temp_location, quiet)
+    except:
+        if resp is not None:
+            # Frees its connection for the next attempt
+            resp.close()
+        if partial:
+            download_cache.release_partial(target_url, partial, validator)
         raise
-    except IOError:
+    if partial:
+        download_cache.release_partial(target_url, partial, None)
+    return temp_location, content_type, hashes
+
+
+def _get_range_response(target_url, offset, validator):
+    """Request what follows the first `offset` bytes of `target_url`, if
+    it still is what `validator` identified.  Return the response and the
+    offset it starts at: 0 if the server sent the whole file instead, in
+    which case the partial file is downloaded again from it.  The response
+    is None if the server sent anything else."""
+    request = urllib2.Request(target_url, headers={
+        'Accept-encoding': 'identity',
+        'Range': 'bytes=%d-' % offset,
+        'If-Range': validator})
+    try:
+        resp = urlopen(request)
+    except urllib2.HTTPError:
+        # e.g. 416 Requested Range Not Satisfiable
         e = sys.exc_info()[1]
-        # Typically an FTP error
-        logger.fatal("Error %s while getting %s" % (e, link))
-        raise
-    return resp
+        logger.info('Could not resume download of %s: HTTP error %s'
+                    % (target_url, e.code))
+        return None, 0
+    except (IOError, httplib.HTTPException):
+        return None, 0
+    if resp.getcode() == 200:
+        # The file changed, or the server doesn't support ranges
+        return resp, 0
+    content_range = resp.info().get('content-range') or ''
+    match = re.match(r'bytes\s+(\d+)-', content_range)
+    if (resp.getcode() == 206 and match
+            and int(match.group(1)) == offset):
+        return resp, offset
+    resp.close()
+    return None, 0
+
+
+def _get_range_validator(resp):
+    """Return what to send as If-Range to resume the download of `resp`:
+    its ETag, unless it is a weak one, or its Last-Modified header."""
+    etag = resp.info().get('etag')
+    if etag and not etag.startswith('W/'):
+        return etag
+    return resp.info().get('last-modified')
+
+
+def _get_download_filename(resp, link):
+    """Return the content type of `resp` and the name to save it under."""
+    content_type = resp.info().get('content-type', '')
+    filename = link.filename  # fallback
+    # Have a look at the Content-Disposition header for a better guess
+    content_disposition = resp.info().get('content-disposition')
+    if content_disposition:
+        type, params = cgi.parse_header(content_disposition)
+        # We use ``or`` here because we don't want to use an "empty" value
+        # from the filename param.
+        filename = params.get('filename') or filename
+    ext = splitext(filename)[1]
+    if not ext:
+        ext = mimetypes.guess_extension(content_type)
+        if ext:
+            filename += ext
+    if not ext and link.url != geturl(resp):
+        ext = os.path.splitext(geturl(resp))[1]
+        if ext:
+            filename += ext
+    return content_type, filename
+
+
+class Downloader(object):
+    """
+    Downloads archives in the background, on up to `workers` threads and
+    `per_host` for each host, so that unpack_http_url() finds them already
+    downloaded when their turn comes.
+
+    Failed background downloads are forgotten: unpack_http_url() then
+    downloads the archive itself, reporting errors as usual.
+    """
+
+    def __init__(self, workers, per_host=2):
+        self.pool = FetchPool(workers, per_host)
+        self.temp_dir = None
+        self._downloads = {}
+        self._lock = threading.Lock()
+
+    def start(self, link, download_cache=None, download_dir=None):
+        """Start downloading `link` unless it is already being downloaded,
+        or is in the download cache (a DownloadCache) or the download
+        directory."""
+        target_url = link.url.split('#', 1)[0]
+        if target_url in self._downloads:
+            return
+        if download_cache and download_cache.lookup(target_url):
+            return
+        if download_dir and os.path.exists(os.path.join(download_dir, link.filename)):
+            return
+        # Downloads are started from the background lookups too
+        self._lock.acquire()
+        try:
+            if target_url in self._downloads:
+                return
+            if self.temp_dir is None:
+                self.temp_dir = tempfile.mkdtemp('-download', 'pip-')
+            temp_dir = tempfile.mkdtemp(dir=self.temp_dir)
+            logger.info('Downloading %s in the background' % link)
+            self._downloads[target_url] = self.pool.submit(
+                target_url, _download_http_url, link, temp_dir, True,
+                download_cache)
+        finally:
+            self._lock.release()
+
+    def take(self, link):
+        """Wait for the background download of `link`, if one was started,
+        and return it as a (path, content type, hashes) triple, or None."""
+        future = self._downloads.pop(link.url.split('#', 1)[0], None)
+        if future is None:
+            return None
+        try:
+            return future.result()
+        except (IOError, OSError, socket.error, httplib.HTTPException):
+            e = sys.exc_info()[1]
+            logger.info('Background download of %s failed: %s' % (link, e))
+            return None
+
+    def shutdown(self):
+        """Drop the downloads that haven't started yet, and stop the threads
+        once the others are done."""
+        for future in list(self._downloads.values()):
+            future.cancel()
+        self.pool.shutdown()
+
+    def cleanup(self):
+        """Drop the downloads that were not used and remove their files."""
+        self.shutdown()
+        downloads = list(self._downloads.values())
+        self._downloads = {}
+        for future in downloads:
+            # Those kept in the download cache's directory
+            if future.exception() is None:
+                path = future.result()[0]
+                if os.path.exists(path):
+                    os.remove(path)
+        if self.temp_dir is not None:
+            rmtree(self.temp_dir)
+            self.temp_dir = None
+
+
+def _get_response_from_url(target_url, link):
+    return urlopen(target_url)
+
+
+def _download_with_failover(links, temp_dir, download_cache=None):
+    """Download the first of `links` that can be, each with the retries
+    of the retry policy; see _download_http_url() for the result."""
+    for i, link in enumerate(links):
+        try:
+            return retry_policy.call(_download_http_url, link, temp_dir,
+                                     download_cache=download_cache)
+        except (IOError, OSError, socket.error, httplib.HTTPException):
+            e = sys.exc_info()[1]
+            last = i == len(links) - 1 or not retry_policy.is_transient(e)
+            log_meth = last and logger.fatal or logger.warn
+            if isinstance(e, urllib2.HTTPError):
+                log_meth("HTTP error %s while getting %s" % (e.code, link))
+            else:
+                # Typically an FTP error
+                log_meth("Error %s while getting %s" % (e, link))
+            if last:
+                raise
+            logger.notify('Trying mirror %s' % links[i + 1])
 
 
 class Urllib2HeadRequest(urllib2.Request):
@@ -3,7 +3,8 @@
 import sys
 import os
 import re
-import gzip
+import bisect
+import hashlib
 import mimetypes
 import posixpath
 import pkg_resources
@@ -11,26 +12,37 @@ import random
 import socket
 import ssl
 import string
+import time
 import zlib
 
+try:
+    import json
+except ImportError:
+    json = None
+
 try:
     import threading
 except ImportError:
     import dummy_threading as threading
 
 from pip.log import logger
-from pip.util import Inf, normalize_name, splitext, is_prerelease
+from pip.util import (Inf, normalize_name, splitext, is_prerelease,
+                      atomic_write)
 from pip.exceptions import DistributionNotFound, BestVersionAlreadyInstalled,\
     InstallationError
-from pip.backwardcompat import (WindowsError, BytesIO,
-                                Queue, urlparse,
-                                URLError, HTTPError, u,
+from pip.backwardcompat import (WindowsError,
+                                Queue, urlparse, urllib2,
+                                URLError, HTTPError, u, b, u_decoder,
+                                string_types,
                                 product, url2pathname,
                                 Empty as QueueEmpty)
 from pip.backwardcompat import CertificateError
-from pip.download import urlopen, path_to_url2, url_to_path, geturl, Urllib2HeadRequest
+from pip.download import (urlopen, path_to_url2, url_to_path, geturl,
+                          Urllib2HeadRequest, discard_response, retry_policy)
+import pip.wheel
 from pip.wheel import Wheel, wheel_ext, wheel_distribute_support, distribute_requirement
 from pip.pep425tags import supported_tags
+from pip.pool import Future, WorkerPool, FetchPool
 
 __all__ = ['PackageFinder']
 
@@ -45,21 +57,67 @@ class PackageFinder(object):
     packages, by reading pages and looking for appropriate links
     """
 
+    fetch_workers = 10
+    fetch_workers_per_host = 5
+
     def __init__(self, find_links, index_urls,
             use_mirrors=False, mirrors=None, main_mirror_url=None,
-            use_wheel=False):
+            use_wheel=False, index_cache=None, index_cache_max_age=None,
+            index_cache_size=None, resolve_workers=0, mirror_selection='all',
+            index_strategy='all'):
         self.find_links = find_links
         self.index_urls = index_urls
         self.dependency_links = []
-        self.cache = PageCache()
+        # Dependency links to archives of a given project, and the other
+        # ones, as (url, comes_from) pairs
+        self._dependency_archives = []
+        self._dependency_pages = []
+        self._dependency_tables = {}
+        if index_cache:
+            self.cache = DiskPageCache(index_cache,
+                                       max_age=index_cache_max_age,
+                                       max_size=index_cache_size)
+        else:
+            self.cache = PageCache()
         # These are boring links that have already been logged somehow:
         self.logged_links = set()
+        # The listings of --find-links directories, by real path
+        self._find_links_dirs = {}
+        # The project names listed by the index roots, by normalized name
+        self._name_indexes = {}
         if use_mirrors:
             self.mirror_urls = self._get_mirror_urls(mirrors, main_mirror_url)
             logger.info('Using PyPI mirrors: %s' % ', '.join(self.mirror_urls))
         else:
             self.mirror_urls = []
+        # With --mirror-selection=fastest, pages of the main index are
+        # fetched from whichever of it and its mirrors answers first
+        if self.mirror_urls and self.index_urls and mirror_selection == 'fastest':
+            self.mirror_selector = MirrorSelector(
+                self.index_urls[0], self.mirror_urls, self.cache)
+        else:
+            self.mirror_selector = None
         self.use_wheel = use_wheel
+        # How far to look beyond the main index: 'all', 'first-match' or
+        # 'first-match-parallel'
+        self.index_strategy = index_strategy
+        # Index lookups started ahead of find_requirement(), by project name
+        self._prefetched = {}
+        if resolve_workers:
+            self.pool = WorkerPool(resolve_workers)
+        else:
+            self.pool = None
+        # Fetches the pages crawled for every requirement
+        self.fetcher = FetchPool(self.fetch_workers, self.fetch_workers_per_host)
+
+    def shutdown(self):
+        """Stop the finder's worker threads once it is done with: lookups
+        started ahead that haven't begun yet are dropped."""
+        for future in self._prefetched.values():
+            future.cancel()
+        if self.pool is not None:
+            self.pool.shutdown()
+        self.fetcher.shutdown()
 
     @property
     def use_wheel(self):
@@ -71,12 +129,66 @@ class PackageFinder(object):
         if self._use_wheel and not wheel_distribute_support():
             raise InstallationError("pip's wheel support requires %s." % distribute_requirement)
 
-    def add_dependency_links(self, links):
-        ## FIXME: this shouldn't be global list this, it should only
-        ## apply to requirements of the package that specifies the
-        ## dependency_links value
-        ## FIXME: also, we should track comes_from (i.e., use Link)
-        self.dependency_links.extend(links)
+    def add_dependency_links(self, links, comes_from=None):
+        """Add the dependency_links of `comes_from`, the requirement that
+        declares them, or of no requirement in particular if it is None.
+
+        Links to archives of a project (or with an #egg= fragment) are
+        only used when looking that project up.  Other links are pages,
+        which are searched for the dependencies of `comes_from`, direct or
+        not, or for every requirement if it is None.  The pages of the
+        other requirements are only searched for a requirement that isn't
+        found otherwise, e.g. one listed before `comes_from` was.
+        """
+        for url in links:
+            if url not in self.dependency_links:
+                self.dependency_links.append(url)
+            if self._is_archive_link(Link(url)):
+                if url not in self._dependency_archives:
+                    self._dependency_archives.append(url)
+                    self._dependency_tables.clear()
+            elif (url, comes_from) not in self._dependency_pages:
+                self._dependency_pages.append((url, comes_from))
+
+    def _is_archive_link(self, link):
+        if link.egg_fragment:
+            return True
+        egg_info, ext = link.splitext()
+        if egg_info.endswith('.tar'):
+            ext = '.tar' + ext
+        return ext in self._known_extensions()
+
+    def _dependency_versions(self, req):
+        """Return the versions of `req` found in the dependency links to
+        archives.  The links are only parsed once, in a LinkTable."""
+        key = self._known_extensions()
+        table = self._dependency_tables.get(key)
+        if table is None:
+            links = [Link(url) for url in self._dependency_archives]
+            table = LinkTable.from_links(self, self._sort_links(links))
+            self._dependency_tables[key] = table
+        return table.find(req.name.lower())
+
+    def _dependency_pages_for(self, req, others=False):
+        """Return the dependency links to pages that apply to `req`: those
+        declared by one of the requirements it comes from, or by none.
+        With `others`, return those declared by the other requirements
+        instead."""
+        ancestors = []
+        parent = req.comes_from
+        while (parent is not None and not isinstance(parent, string_types)
+               and parent not in ancestors):
+            ancestors.append(parent)
+            parent = parent.comes_from
+        urls = []
+        for url, comes_from in self._dependency_pages:
+            applies = comes_from is None or comes_from in ancestors
+            if applies != others and url not in urls:
+                urls.append(url)
+        if others:
+            applying = self._dependency_pages_for(req)
+            urls = [url for url in urls if url not in applying]
+        return urls
 
     def _sort_locations(self, locations):
         """
@@ -106,9 +218,9 @@ class PackageFinder(object):
                 else:
                     path = url_to_path(url)
                 if is_find_link and os.path.isdir(path):
-                    path = os.path.realpath(path)
-                    for item in os.listdir(path):
-                        sort_path(os.path.join(path, item))
+                    directory = self._get_find_links_dir(path)
+                    files.extend(directory.files)
+                    urls.extend(directory.urls)
                 elif is_file_url and os.path.isdir(path):
                     urls.append(url)
                 elif os.path.isfile(path):
@@ -118,6 +230,59 @@ class PackageFinder(object):
 
         return files, urls
 
+    def _get_find_links_dir(self, path):
+        """Return the FindLinksDirectory listing the --find-links directory
+        `path`.  Listings are kept for the whole run, and on disk along with
+        the index page cache, until the directory's mtime changes."""
+        path = os.path.realpath(path)
+        mtime = os.path.getmtime(path)
+        directory = self._find_links_dirs.get(path)
+        if directory is not None and directory.mtime == mtime:
+            return directory
+        config = self._link_table_config()
+        directory = FindLinksDirectory.load(
+            self.cache.get_stored_listing(path), path, mtime, config)
+        if directory is None:
+            directory = FindLinksDirectory.scan(self, path, mtime)
+            listing = directory.dump(config)
+            if listing is not None:
+                self.cache.store_listing(path, listing)
+        self._find_links_dirs[path] = directory
+        return directory
+
+    def _link_table_config(self):
+        """What the entries of a link table depend on, besides the links"""
+        return [list(self._known_extensions()), sys.version[:3],
+                [list(tag) for tag in pip.wheel.supported_tags]]
+
+    def _local_versions(self, locations, search_name, version=None):
+        """Like _package_versions() for the local files of `locations`, with
+        --find-links directories looked up in their link tables.  Only the
+        given version of those is returned, if one is passed."""
+        found_versions = []
+        seen = set()
+        files = []
+        for location in locations:
+            if location in self.find_links:
+                if os.path.exists(location):
+                    path = location
+                elif location.startswith('file:'):
+                    path = url_to_path(location)
+                else:
+                    continue
+                if os.path.isdir(path):
+                    directory = self._get_find_links_dir(path)
+                    if directory.path not in seen:
+                        seen.add(directory.path)
+                        found_versions.extend(
+                            directory.link_table.find(search_name, version))
+                    continue
+            files.append(location)
+        files = self._sort_locations(files)[0]
+        found_versions.extend(self._package_versions(
+            [Link(url) for url in files], search_name))
+        return found_versions
+
     def _link_sort_key(self, link_tuple):
         """
         Function used to generate link sort key for link tuples.
@@ -153,7 +318,14 @@ class PackageFinder(object):
         """
         return sorted(applicable_versions, key=self._link_sort_key, reverse=True)
 
-    def find_requirement(self, req, upgrade):
+    def _get_locations(self, req):
+        """Return the index pages, find-links and dependency links that
+        have to be searched for `req`."""
+        return (self._get_index_locations(req) + self.find_links
+                + self._dependency_pages_for(req))
+
+    def _get_index_locations(self, req):
+        """Return the pages of the indexes and mirrors listing `req`."""
 
         def mkurl_pypi_url(url):
             loc = posixpath.join(url, url_name)
@@ -178,21 +350,117 @@ class PackageFinder(object):
 
         # Combine index URLs with mirror URLs here to allow
         # adding more index URLs from requirements files
-        all_index_urls = self.index_urls + self.mirror_urls
+        if self.mirror_selector is not None:
+            # The mirrors only stand in for the main index
+            all_index_urls = self.index_urls
+        else:
+            all_index_urls = self.index_urls + self.mirror_urls
 
         if url_name is not None:
             locations = [
                 mkurl_pypi_url(url)
-                for url in all_index_urls] + self.find_links
+                for url in all_index_urls]
         else:
-            locations = list(self.find_links)
-        locations.extend(self.dependency_links)
+            locations = []
         for version in req.absolute_versions:
             if url_name is not None and main_index_url is not None:
                 locations = [
                     posixpath.join(main_index_url.url, version)] + locations
 
-        file_locations, url_locations = self._sort_locations(locations)
+        if (self.index_strategy != 'all' and url_name is not None
+                and len(self.index_urls) > 1):
+            # The mirrors and version pages go with the main index
+            extra_pages = [mkurl_pypi_url(url) for url in self.index_urls[1:]]
+            groups = [(self.index_urls[0],
+                       [loc for loc in locations if loc not in extra_pages])]
+            groups.extend([(url, [page]) for url, page
+                           in zip(self.index_urls[1:], extra_pages)])
+            locations = self._first_matching_index(req, groups, locations)
+        return locations
+
+    def _first_matching_index(self, req, groups, locations):
+        """Return the pages of the first index listing a version that `req`
+        accepts, or all the `locations` if none does.  `groups` are the
+        (index_url, pages) of each index, by priority.
+
+        The indexes are asked one after the other, or all at once with the
+        'first-match-parallel' strategy, in which case the fetches for the
+        lower priority indexes that have not started yet are cancelled once
+        an index matches."""
+        parallel = self.index_strategy == 'first-match-parallel'
+        if parallel:
+            futures = [[self.fetcher.submit(url, self._get_page, Link(url), req)
+                        for url in pages] for index_url, pages in groups]
+        search_name = req.name.lower()
+        for i, (index_url, pages) in enumerate(groups):
+            if parallel:
+                found = [future.result() for future in futures[i]]
+            else:
+                found = [self._get_page(Link(url), req) for url in pages]
+            versions = []
+            for page in found:
+                if page is not None:
+                    versions.extend(page.link_table(self).find(search_name))
+            for parsed_version, link, version in versions:
+                if version in req.req and (req.prereleases
+                                           or not is_prerelease(version)):
+                    break
+            else:
+                continue
+            if i + 1 < len(groups):
+                logger.info('Found %s on %s, not searching the other indexes'
+                            % (req, index_url))
+                if parallel:
+                    for group_futures in futures[i + 1:]:
+                        for future in group_futures:
+                            future.cancel()
+            return pages
+        return locations
+
+    def prefetch_requirement(self, req):
+        """Start fetching the index pages for `req` in the background, so
+        that they are already cached when find_requirement() needs them.
+        Does nothing unless the finder was given resolve workers."""
+        if self.pool is None or req.name is None:
+            return
+        key = req.name.lower()
+        if key not in self._prefetched:
+            self._prefetched[key] = self.pool.submit(self._prefetch_pages, req)
+
+    def _prefetch_pages(self, req):
+        if self._pinned_version(req) is not None:
+            # Exact pins are usually found without crawling everything
+            for url in self._get_index_locations(req):
+                self._get_page(Link(url), req)
+            return
+        file_locations, url_locations = self._sort_locations(
+            self._get_locations(req))
+        self._get_pages([Link(url) for url in url_locations], req)
+
+    def find_requirement(self, req, upgrade):
+        prefetched = self._prefetched.get(req.name.lower())
+        if prefetched is not None:
+            # Errors are reported by the lookup below, as usual
+            prefetched.wait()
+
+        pinned_version = self._pinned_version(req)
+        if pinned_version is not None:
+            # Exact pins are first looked up in the local find-links, then in
+            # the index pages, and only crawled for everywhere on a miss.
+            link = self._find_pinned_requirement(req, pinned_version)
+            if link is not None:
+                return link
+
+        index_locations = self._get_index_locations(req)
+        if pinned_version is not None and index_locations:
+            link = self._find_pinned_requirement(req, pinned_version,
+                                                 index_locations)
+            if link is not None:
+                return link
+
+        search_locations = (index_locations + self.find_links
+                            + self._dependency_pages_for(req))
+        file_locations, url_locations = self._sort_locations(search_locations)
 
         locations = [Link(url) for url in url_locations]
         logger.debug('URLs to search for versions for %s:' % req)
@@ -202,42 +470,34 @@ class PackageFinder(object):
         found_versions.extend(
             self._package_versions(
                 [Link(url, '-f') for url in self.find_links], req.name.lower()))
-        page_versions = []
-        for page in self._get_pages(locations, req):
-            logger.debug('Analyzing links from page %s' % page.url)
-            logger.indent += 2
-            try:
-                page_versions.extend(self._package_versions(page.links, req.name.lower()))
-            finally:
-                logger.indent -= 2
-        dependency_versions = list(self._package_versions(
-            [Link(url) for url in self.dependency_links], req.name.lower()))
+        page_versions = self._search_pages(locations, req)
+        dependency_versions = self._dependency_versions(req)
         if dependency_versions:
             logger.info('dependency_links found: %s' % ', '.join([link.url for parsed, link, version in dependency_versions]))
-        file_versions = list(self._package_versions(
-                [Link(url) for url in file_locations], req.name.lower()))
-        if not found_versions and not page_versions and not dependency_versions and not file_versions:
-            logger.fatal('Could not find any downloads that satisfy the requirement %s' % req)
-            raise DistributionNotFound('No distributions at all found for %s' % req)
+        file_versions = self._local_versions(search_locations, req.name.lower())
         installed_version = []
         if req.satisfied_by is not None:
             installed_version = [(req.satisfied_by.parsed_version, InfLink, req.satisfied_by.version)]
+        other_pages = self._dependency_pages_for(req, others=True)
+        if other_pages and not self._applicable_versions(
+                req, installed_version + file_versions + found_versions
+                + page_versions + dependency_versions):
+            logger.info('Searching the dependency links of the other '
+                        'requirements for %s' % req)
+            other_files, other_urls = self._sort_locations(other_pages)
+            page_versions.extend(self._search_pages(
+                [Link(url) for url in other_urls], req))
+            file_versions.extend(self._local_versions(
+                other_pages, req.name.lower()))
+        if not found_versions and not page_versions and not dependency_versions and not file_versions:
+            logger.fatal('Could not find any downloads that satisfy the requirement %s' % req)
+            raise DistributionNotFound('No distributions at all found for %s' % req)
         if file_versions:
             file_versions.sort(reverse=True)
             logger.info('Local files found: %s' % ', '.join([url_to_path(link.url) for parsed, link, version in file_versions]))
         #this is an intentional priority ordering
         all_versions = installed_version + file_versions + found_versions + page_versions + dependency_versions
-        applicable_versions = []
-        for (parsed_version, link, version) in all_versions:
-            if version not in req.req:
-                logger.info("Ignoring link %s, version %s doesn't match %s"
-                            % (link, version, ','.join([''.join(s) for s in req.req.specs])))
-                continue
-            elif is_prerelease(version) and not req.prereleases:
-                logger.info("Ignoring link %s, version %s is a pre-release (use --pre to allow)." % (link, version))
-                continue
-            applicable_versions.append((parsed_version, link, version))
-        applicable_versions = self._sort_versions(applicable_versions)
+        applicable_versions = self._applicable_versions(req, all_versions)
         existing_applicable = bool([link for parsed_version, link, version in applicable_versions if link is InfLink])
         if not upgrade and existing_applicable:
             if applicable_versions[0][1] is InfLink:
@@ -262,6 +522,68 @@ class PackageFinder(object):
         return applicable_versions[0][1]
 
 
+    def _search_pages(self, locations, req):
+        """Return the versions of `req` found on the pages at `locations`,
+        and on those they link to."""
+        page_versions = []
+        for page in self._get_pages(locations, req):
+            logger.debug('Analyzing links from page %s' % page.url)
+            logger.indent += 2
+            try:
+                page_versions.extend(self._page_versions(page, req.name.lower()))
+            finally:
+                logger.indent -= 2
+        return page_versions
+
+    def _applicable_versions(self, req, all_versions):
+        """Return the versions in `all_versions` that `req` accepts, best
+        first."""
+        applicable_versions = []
+        for (parsed_version, link, version) in all_versions:
+            if version not in req.req:
+                logger.info("Ignoring link %s, version %s doesn't match %s"
+                            % (link, version, ','.join([''.join(s) for s in req.req.specs])))
+                continue
+            elif is_prerelease(version) and not req.prereleases:
+                logger.info("Ignoring link %s, version %s is a pre-release (use --pre to allow)." % (link, version))
+                continue
+            applicable_versions.append((parsed_version, link, version))
+        return self._sort_versions(applicable_versions)
+
+    def _pinned_version(self, req):
+        """Return the version `req` is pinned to with ``==``, if that is its
+        only specifier and it isn't installed already."""
+        if req.satisfied_by is not None or len(req.req.specs) != 1:
+            return None
+        op, version = req.req.specs[0]
+        if op != '==':
+            return None
+        return version
+
+    def _find_pinned_requirement(self, req, version, index_locations=()):
+        """
+        Look for the pinned `version` of `req` in the local find-links and
+        the given index pages, without following homepage/download links.
+        A match is good enough when it is a wheel or, if wheels aren't
+        used, any archive.  Return its link, or None.
+        """
+        search_name = req.name.lower()
+        found_versions = self._local_versions(self.find_links, search_name, version)
+        found_versions.extend(self._package_versions(
+            [Link(url, '-f') for url in self.find_links], search_name))
+        for url in index_locations:
+            page = self._get_page(Link(url), req)
+            if page is not None:
+                found_versions.extend(page.link_table(self).find(search_name, version))
+        applicable_versions = self._applicable_versions(req, found_versions)
+        if not applicable_versions:
+            return None
+        link = applicable_versions[0][1]
+        if self.use_wheel and not link.wheel:
+            return None
+        logger.info('Using %s for %s==%s without searching further' % (link, req.name, version))
+        return link
+
     def _find_url_name(self, index_url, url_name, req):
         """Finds the true URL name of a package, when the given name isn't quite correct.
         This is usually used to implement case-insensitivity."""
@@ -269,53 +591,82 @@ class PackageFinder(object):
             # Vaguely part of the PyPI API... weird but true.
             ## FIXME: bad to modify this?
             index_url.url += '/'
-        page = self._get_page(index_url, req)
-        if page is None:
+        names = self._get_name_index(index_url, req)
+        if names is None:
             logger.fatal('Cannot fetch index base URL %s' % index_url)
             return
-        norm_name = normalize_name(req.url_name)
-        for link in page.links:
-            base = posixpath.basename(link.path.rstrip('/'))
-            if norm_name == normalize_name(base):
-                logger.notify('Real name of requirement %s is %s' % (url_name, base))
-                return base
-        return None
+        base = names.get(normalize_name(req.url_name))
+        if base is not None:
+            logger.notify('Real name of requirement %s is %s' % (url_name, base))
+        return base
+
+    def _get_name_index(self, index_url, req):
+        """Return a dict mapping the normalized names of the projects listed
+        on the root page of an index to their names there, or None if the
+        page cannot be fetched.  The dict is built once per run, and reused
+        from the page cache while it is younger than its `names_max_age` or
+        while the page has not changed."""
+        url = index_url.url
+        names = self._name_indexes.get(url)
+        if names is not None:
+            return names
+        stored = self.cache.get_stored_names(url)
+        if stored is not None and stored[1]:
+            names = stored[0]
+        else:
+            page = self._get_page(index_url, req)
+            if page is None:
+                return None
+            validators = {}
+            for name in ('ETag', 'Last-Modified'):
+                value = page.headers and page.headers.get(name)
+                if value:
+                    validators[name] = value
+            if stored is not None and validators and stored[2] == validators:
+                names = stored[0]
+            else:
+                names = {}
+                for link in page.links:
+                    base = posixpath.basename(link.path.rstrip('/'))
+                    names.setdefault(normalize_name(base), base)
+            self.cache.store_names(url, names, validators)
+        self._name_indexes[url] = names
+        return names
 
     def _get_pages(self, locations, req):
-        """Yields (page, page_url) from the given locations, skipping
-        locations that have errors, and adding download/homepage links"""
-        pending_queue = Queue()
-        for location in locations:
-            pending_queue.put(location)
-        done = []
+        """Return the pages of the given locations, skipping locations that
+        have errors, and adding download/homepage links.  The pages are
+        fetched on the finder's FetchPool, in the order they are returned."""
+        results = Queue()
         seen = set()
-        threads = []
-        for i in range(min(10, len(locations))):
-            t = threading.Thread(target=self._get_queued_page, args=(req, pending_queue, done, seen))
-            t.setDaemon(True)
-            threads.append(t)
-            t.start()
-        for t in threads:
-            t.join()
-        return done
-
-    _log_lock = threading.Lock()
+        pending = []
 
-    def _get_queued_page(self, req, pending_queue, done, seen):
-        while 1:
-            try:
-                location = pending_queue.get(False)
-            except QueueEmpty:
-                return
+        def fetch(location, is_rel_link):
             if location in seen:
-                continue
+                return
             seen.add(location)
-            page = self._get_page(location, req)
+            # Homepage and download links are often dead for good, so their
+            # failures are remembered across runs; index pages' are not.
+            future = self.fetcher.submit(location.url, self._get_page,
+                                         location, req,
+                                         remember_failures=is_rel_link)
+            pending.append(future)
+            future.add_done_callback(results.put)
+
+        for location in locations:
+            fetch(location, False)
+        done = {}
+        fetched = 0
+        while fetched < len(pending):
+            future = results.get()
+            fetched += 1
+            page = future.result()
             if page is None:
                 continue
-            done.append(page)
+            done[future] = page
             for link in page.rel_links():
-                pending_queue.put(link)
+                fetch(link, True)
+        return [done[future] for future in pending if future in done]
 
     _egg_fragment_re = re.compile(r'#egg=([^&]*)')
     _egg_info_re = re.compile(r'([a-z0-9_.]+)-([a-z0-9_.-]+)', re.I)
@@ -339,6 +690,76 @@ class PackageFinder(object):
             for v in self._link_package_versions(link, search_name):
                 yield v
 
+    def _page_versions(self, page, search_name):
+        """Like _package_versions() for the links of the given page, looked
+        up in the page's link table"""
+        found = page.link_table(self).find(search_name)
+        for parsed_version, link, version in found:
+            logger.debug('Found link %s, version: %s' % (link, version))
+        return found
+
+    def _link_table_entries(self, link):
+        """
+        Yield the (search_name, python_version) pairs of every project the
+        given link could be a distribution of; the version is None when the
+        link must be skipped for that project.  This mirrors
+        _link_package_versions().
+        """
+        wheel_name = None
+        if link.egg_fragment:
+            egg_info = link.egg_fragment
+        else:
+            egg_info, ext = link.splitext()
+            if not ext:
+                if link not in self.logged_links:
+                    logger.debug('Skipping link %s; not a file' % link)
+                    self.logged_links.add(link)
+                return
+            if egg_info.endswith('.tar'):
+                # Special double-extension case:
+                egg_info = egg_info[:-4]
+                ext = '.tar' + ext
+            if ext not in self._known_extensions():
+                if link not in self.logged_links:
+                    logger.debug('Skipping link %s; unknown archive format: %s' % (link, ext))
+                    self.logged_links.add(link)
+                return
+            if "macosx10" in link.path and ext == '.zip':
+                if link not in self.logged_links:
+                    logger.debug('Skipping link %s; macosx10 one' % (link))
+                    self.logged_links.add(link)
+                return
+            if link.wheel:
+                wheel_name = link.wheel.name.lower()
+                if link.wheel.supported():
+                    yield wheel_name, self._link_version(link, link.wheel.version)
+                else:
+                    logger.debug('Skipping %s because it is not compatible with this Python' % link)
+                    yield wheel_name, None
+        match = self._egg_info_re.search(egg_info)
+        if not match:
+            logger.debug('Could not parse version from link: %s' % link)
+            return
+        egg_info = match.group(0)
+        # To match the "safe" name that pkg_resources creates:
+        name = egg_info.lower().replace('_', '-')
+        # project name and version must be separated by a dash
+        pos = name.find('-')
+        while pos != -1:
+            if name[:pos] != wheel_name:
+                yield name[:pos], self._link_version(link, egg_info[pos + 1:])
+            pos = name.find('-', pos + 1)
+
+    def _link_version(self, link, version):
+        match = self._py_version_re.search(version)
+        if match:
+            version = version[:match.start()]
+            py_version = match.group(1)
+            if py_version != sys.version[:3]:
+                logger.debug('Skipping %s because Python version is incorrect' % link)
+                return None
+        return version
+
     def _known_extensions(self):
         extensions = ('.tar.gz', '.tar.bz2', '.tar', '.tgz', '.zip')
         if self.use_wheel:
@@ -414,8 +835,52 @@ class PackageFinder(object):
         else:
             return None
 
-    def _get_page(self, link, req):
-        return HTMLPage.get_page(link, req, cache=self.cache)
+    def _get_page(self, link, req, remember_failures=False):
+        if (self.mirror_selector is not None
+                and self.mirror_selector.covers(link.url)):
+            url = link.url.split('#', 1)[0]
+            return self.cache.get_or_fetch(
+                url, lambda: self._get_mirrored_page(url, req))
+        return HTMLPage.get_page(link, req, cache=self.cache,
+                                 remember_failures=remember_failures)
+
+    def _get_mirrored_page(self, url, req):
+        def fetch(link):
+            # Not through the cache's get_or_fetch(): the main index's copy
+            # has the url whose fetch is waiting for this one
+            replica_url = link.url.split('#', 1)[0]
+            if self.cache.too_many_failures(replica_url):
+                return None
+            return HTMLPage._fetch_page(link, replica_url, req, self.cache,
+                                        skip_archives=True)
+        page = self.mirror_selector.get_page(url, fetch)
+        if page is not None:
+            self.cache.add_page([url], page)
+        return page
+
+    def get_mirror_links(self, link):
+        """Return the links to the copies of `link` on the mirrors, best
+        first, if it is on the host of the main index: mirrors serve the
+        same paths."""
+        if not self.mirror_urls or not self.index_urls:
+            return []
+        scheme, netloc, path, query, fragment = urlparse.urlsplit(link.url)
+        if urlparse.urlsplit(self.index_urls[0])[:2] != (scheme, netloc):
+            return []
+        if self.mirror_selector is not None:
+            mirror_urls = [url for url in self.mirror_selector.ranked()
+                           if url in self.mirror_urls]
+        else:
+            mirror_urls = self.mirror_urls
+        links = []
+        for mirror_url in mirror_urls:
+            mirror_scheme, mirror_netloc = urlparse.urlsplit(mirror_url)[:2]
+            if mirror_scheme == 'file':
+                continue
+            links.append(Link(urlparse.urlunsplit(
+                (mirror_scheme, mirror_netloc, path, query, fragment)),
+                link.comes_from))
+        return links
 
     def _get_mirror_urls(self, mirrors=None, main_mirror_url=None):
         """Retrieves a list of URLs from the main mirror DNS entry
@@ -439,6 +904,195 @@ class PackageFinder(object):
         return list(mirror_urls)
 
 
+class MirrorSelector(object):
+    """Fetches the pages of an index from the fastest healthy of its
+    replicas: the index itself and its mirrors.
+
+    Replicas are ranked by the median of their recent response times, with
+    the ones whose last request failed last.  The times come from a HEAD
+    request probing each replica when no ranking younger than
+    `probe_max_age` seconds was stored in the page cache, and from every
+    page fetched afterwards.
+
+    Requests are hedged: when the replica asked for a page has not answered
+    within the `hedge_percentile` of its recent response times, the next
+    replica is asked too, and the first page to arrive wins.  A failed
+    request moves on to the next replica right away.
+    """
+
+    hedge_percentile = 90
+    default_hedge_delay = 1.0
+    min_hedge_delay = 0.05
+    max_samples = 20
+    probe_timeout = 5
+    probe_max_age = 3600
+    save_interval = 10
+
+    def __init__(self, index_url, mirror_urls, cache):
+        self.index_url = index_url.rstrip('/') + '/'
+        self.replicas = [self.index_url]
+        for url in mirror_urls:
+            if url not in self.replicas:
+                self.replicas.append(url)
+        self.cache = cache
+        self._stats = None
+        self._saved = 0
+        self._lock = threading.Lock()
+
+    def covers(self, url):
+        """Whether `url` is a page of the main index."""
+        return (url.startswith(self.index_url)
+                or url == self.index_url.rstrip('/'))
+
+    def _get_stats(self):
+        """The stats of the replicas, as {'probed': time, 'replicas':
+        {url: {'samples': [seconds, ...], 'failures': count}}}, loaded or
+        probed on first use."""
+        self._lock.acquire()
+        try:
+            if self._stats is None:
+                stats = self.cache.get_mirror_stats()
+                if (not isinstance(stats, dict)
+                        or time.time() - stats.get('probed', 0) > self.probe_max_age
+                        or set(stats.get('replicas', ())) != set(self.replicas)):
+                    stats = self._probe()
+                self._stats = stats
+            return self._stats
+        finally:
+            self._lock.release()
+
+    def _probe(self):
+        replicas = dict((url, {'samples': [], 'failures': 0})
+                        for url in self.replicas)
+        results = Queue()
+
+        def probe(url):
+            start = time.time()
+            try:
+                if url.lower().startswith('file:'):
+                    elapsed = 0.0
+                else:
+                    discard_response(urlopen(Urllib2HeadRequest(url)))
+                    elapsed = time.time() - start
+            except:
+                elapsed = None
+            results.put((url, elapsed))
+
+        for url in self.replicas:
+            t = threading.Thread(target=probe, args=(url,))
+            t.setDaemon(True)
+            t.start()
+        deadline = time.time() + self.probe_timeout
+        answered = set()
+        while len(answered) < len(self.replicas):
+            try:
+                url, elapsed = results.get(True, max(deadline - time.time(), 0))
+            except QueueEmpty:
+                break
+            answered.add(url)
+            if elapsed is None:
+                replicas[url]['failures'] = 1
+            else:
+                replicas[url]['samples'].append(elapsed)
+        for url in set(self.replicas) - answered:
+            replicas[url]['failures'] = 1
+        stats = {'probed': time.time(), 'replicas': replicas}
+        self.cache.store_mirror_stats(stats)
+        self._saved = time.time()
+        logger.info('Probed mirrors: %s' % ', '.join(
+            ['%s (%s)' % (url, r['failures'] and 'failed'
+                          or '%dms' % (r['samples'][0] * 1000))
+             for url, r in sorted(replicas.items())]))
+        return stats
+
+    def ranked(self):
+        """The replicas, best first."""
+        replicas = self._get_stats()['replicas']
+
+        def key(url):
+            record = replicas[url]
+            samples = sorted(record['samples'])
+            if samples:
+                median = samples[len(samples) // 2]
+            else:
+                median = Inf
+            return (record['failures'] > 0, median, self.replicas.index(url))
+        return sorted(self.replicas, key=key)
+
+    def hedge_delay(self, url):
+        """How long to wait for `url` before asking the next replica too."""
+        samples = sorted(self._get_stats()['replicas'][url]['samples'])
+        if not samples:
+            return self.default_hedge_delay
+        index = max(int(len(samples) * self.hedge_percentile / 100.0 + 0.5) - 1, 0)
+        return max(samples[min(index, len(samples) - 1)], self.min_hedge_delay)
+
+    def record(self, url, elapsed):
+        """Record a response of `url` taking `elapsed` seconds, or a failure
+        if `elapsed` is None."""
+        stats = self._get_stats()
+        self._lock.acquire()
+        try:
+            record = stats['replicas'][url]
+            if elapsed is None:
+                record['failures'] += 1
+            else:
+                record['failures'] = 0
+                record['samples'] = (record['samples'] + [elapsed])[-self.max_samples:]
+            save = time.time() - self._saved >= self.save_interval
+            if save:
+                self._saved = time.time()
+        finally:
+            self._lock.release()
+        if save:
+            self.cache.store_mirror_stats(stats)
+
+    def get_page(self, url, fetch):
+        """Fetch the page of the main index at `url` from the replicas, with
+        fetch(link), which returns the page or None."""
+        path = url[len(self.index_url):]
+        replicas = self.ranked()
+        results = Queue()
+
+        def attempt(replica):
+            start = time.time()
+            try:
+                page = fetch(Link(replica + path))
+            except:
+                page = None
+            if page is None:
+                self.record(replica, None)
+            else:
+                self.record(replica, time.time() - start)
+            results.put(page)
+
+        started = finished = 0
+        hedge_at = 0
+        while finished < len(replicas):
+            if started < len(replicas) and (started == finished
+                                            or time.time() >= hedge_at):
+                replica = replicas[started]
+                if started:
+                    logger.debug('Also asking %s for %s' % (replica, url))
+                t = threading.Thread(target=attempt, args=(replica,))
+                t.setDaemon(True)
+                t.start()
+                started += 1
+                hedge_at = time.time() + self.hedge_delay(replica)
+            if started < len(replicas):
+                timeout = max(hedge_at - time.time(), 0)
+            else:
+                timeout = None
+            try:
+                page = results.get(True, timeout)
+            except QueueEmpty:
+                continue
+            finished += 1
+            if page is not None:
+                return page
+        return None
+
+
 class PageCache(object):
     """Cache of HTML pages"""
 
@@ -448,6 +1102,8 @@ class PageCache(object):
         self._failures = {}
         self._pages = {}
         self._archives = {}
+        self._pending = {}
+        self._lock = threading.Lock()
 
     def too_many_failures(self, url):
         return self._failures.get(url, 0) >= self.failure_limit
@@ -455,41 +1111,528 @@ class PageCache(object):
     def get_page(self, url):
         return self._pages.get(url)
 
+    def get_or_fetch(self, url, fetch):
+        """Return the page cached for `url`, or the result of fetch().  Only
+        one fetch of a url runs at a time: other threads asking for it wait
+        for that fetch and share its result."""
+        self._lock.acquire()
+        try:
+            page = self._pages.get(url)
+            if page is not None:
+                return page
+            future = self._pending.get(url)
+            fetching = future is None
+            if fetching:
+                future = self._pending[url] = Future()
+        finally:
+            self._lock.release()
+        if not fetching:
+            return future.result()
+        try:
+            try:
+                page = fetch()
+            except:
+                future.set_exception(sys.exc_info()[1])
+                raise
+            future.set_result(page)
+            return page
+        finally:
+            self._lock.acquire()
+            try:
+                del self._pending[url]
+            finally:
+                self._lock.release()
+
     def is_archive(self, url):
         return self._archives.get(url, False)
 
     def set_is_archive(self, url, value=True):
         self._archives[url] = value
 
-    def add_page_failure(self, url, level):
-        self._failures[url] = self._failures.get(url, 0)+level
+    def add_page_failure(self, url, level, remember=False, host_failure=False):
+        """Record a failure to fetch `url`.  `remember` asks for it to be
+        kept for later runs too, and `host_failure` tells the whole host
+        could not be reached."""
+        self._lock.acquire()
+        try:
+            self._failures[url] = self._failures.get(url, 0)+level
+        finally:
+            self._lock.release()
+
+    def is_dead(self, url):
+        """Whether `url` or its host failed in an earlier run recently
+        enough not to be tried again yet.  This cache only lives for one
+        run, so it never knows of any."""
+        return False
 
     def add_page(self, urls, page):
         for url in urls:
             self._pages[url] = page
 
+    def get_stored_page(self, url):
+        """Return a ``(page, fresh)`` pair for a previously stored copy of
+        `url`.  This cache only lives for one run, so it never has one."""
+        return None, False
+
+    def store_page(self, url, page):
+        pass
+
+    def refresh_stored_page(self, url):
+        pass
+
+    def get_stored_listing(self, path):
+        """Return the listing previously stored for the --find-links
+        directory `path`, if any."""
+        return None
+
+    def store_listing(self, path, listing):
+        pass
+
+    def get_stored_names(self, url):
+        """Return a ``(names, fresh, validators)`` tuple for the project
+        names previously stored for the index root `url`, if any."""
+        return None
+
+    def store_names(self, url, names, validators):
+        pass
+
+    def get_mirror_stats(self):
+        """Return the mirror stats stored by store_mirror_stats(), if any."""
+        return None
+
+    def store_mirror_stats(self, stats):
+        pass
+
+
+class DiskPageCache(PageCache):
+    """Cache of HTML pages that also keeps page bodies on disk between runs.
+
+    Pages younger than `max_age` seconds are reused without touching the
+    network; older ones are revalidated with a conditional request using
+    their stored ETag/Last-Modified headers.  The least recently used
+    entries are removed once the files of the cache grow beyond `max_size`
+    megabytes, until they are back under `prune_ratio` of it.  The size is
+    kept up to date as files are written, so the directory is only scanned
+    when first written to and when it is pruned.
+
+    Failures that are asked to be remembered are kept too, by URL and, for
+    unreachable hosts, by host.  They are not retried for `failure_backoff`
+    seconds, a delay which doubles with each further failure up to
+    `max_failure_backoff`, or until a fetch from them succeeds.
+    """
+
+    default_max_age = 600
+    default_max_size = 100
+    stored_headers = ('Content-Type', 'ETag', 'Last-Modified')
+    failures_file = 'failures.json'
+    mirrors_file = 'mirrors.json'
+    names_max_age = 24 * 3600
+    failure_backoff = 3600
+    max_failure_backoff = 7 * 24 * 3600
+    prune_ratio = 0.9
+
+    def __init__(self, cache_dir, max_age=None, max_size=None):
+        super(DiskPageCache, self).__init__()
+        self.cache_dir = os.path.abspath(os.path.expanduser(cache_dir))
+        if max_age is None:
+            max_age = self.default_max_age
+        if max_size is None:
+            max_size = self.default_max_size
+        self.max_age = max_age
+        self.max_size = max_size * 1000 * 1000
+        self._dead = None
+        # The total size of the files of the cache, once scanned
+        self._size = None
+        self._size_lock = threading.Lock()
+        if json is None:
+            logger.warn('Index page cache needs the json module; '
+                        'ignoring %s' % self.cache_dir)
+            self.cache_dir = None
+        elif not os.path.isdir(self.cache_dir):
+            try:
+                os.makedirs(self.cache_dir)
+            except OSError:
+                e = sys.exc_info()[1]
+                logger.warn('Could not create index page cache %s: %s'
+                            % (self.cache_dir, e))
+                self.cache_dir = None
+
+    def _entry_path(self, url, ext):
+        key = hashlib.sha1(b(url)).hexdigest()
+        return os.path.join(self.cache_dir, key + ext)
+
+    def _is_cacheable(self, url):
+        return (self.cache_dir is not None
+                and url.lower().startswith(('http:', 'https:')))
+
+    def get_stored_page(self, url):
+        if not self._is_cacheable(url):
+            return None, False
+        meta_path = self._entry_path(url, '.json')
+        try:
+            fp = open(meta_path)
+            try:
+                meta = json.load(fp)
+            finally:
+                fp.close()
+            fp = open(self._entry_path(url, '.html'), 'rb')
+            try:
+                content = fp.read()
+            finally:
+                fp.close()
+        except (IOError, OSError, ValueError):
+            return None, False
+        fresh = time.time() - meta.get('stored', 0) < self.max_age
+        page = HTMLPage(u(content), meta['real_url'], meta['headers'])
+        return page, fresh
+
+    def store_page(self, url, page):
+        if not self._is_cacheable(url):
+            return
+        headers = {}
+        for name in self.stored_headers:
+            value = page.headers and page.headers.get(name)
+            if value:
+                headers[name] = value
+        meta = {'url': url, 'real_url': page.url,
+                'headers': headers, 'stored': time.time()}
+        try:
+            self._write(self._entry_path(url, '.html'), b(page.content))
+            self._write(self._entry_path(url, '.json'), b(json.dumps(meta)))
+        except (IOError, OSError):
+            e = sys.exc_info()[1]
+            logger.info('Could not store %s in the index page cache: %s'
+                        % (url, e))
+
+    def refresh_stored_page(self, url):
+        """Mark the stored copy of `url` as just revalidated."""
+        if not self._is_cacheable(url):
+            return
+        meta_path = self._entry_path(url, '.json')
+        try:
+            fp = open(meta_path)
+            try:
+                meta = json.load(fp)
+            finally:
+                fp.close()
+            meta['stored'] = time.time()
+            self._write(meta_path, b(json.dumps(meta)))
+        except (IOError, OSError, ValueError):
+            pass
+
+    def get_stored_listing(self, path):
+        if self.cache_dir is None:
+            return None
+        try:
+            fp = open(self._entry_path(path, '.listing'))
+            try:
+                return json.load(fp)
+            finally:
+                fp.close()
+        except (IOError, OSError, ValueError):
+            return None
+
+    def store_listing(self, path, listing):
+        if self.cache_dir is None:
+            return
+        try:
+            self._write(self._entry_path(path, '.listing'),
+                        b(json.dumps(listing)))
+        except (IOError, OSError):
+            e = sys.exc_info()[1]
+            logger.info('Could not store the listing of %s in the index page cache: %s'
+                        % (path, e))
+
+    def get_stored_names(self, url):
+        if not self._is_cacheable(url):
+            return None
+        try:
+            fp = open(self._entry_path(url, '.names'))
+            try:
+                stored = json.load(fp)
+            finally:
+                fp.close()
+        except (IOError, OSError, ValueError):
+            return None
+        fresh = time.time() - stored.get('stored', 0) < self.names_max_age
+        return stored['names'], fresh, stored.get('validators', {})
+
+    def store_names(self, url, names, validators):
+        if not self._is_cacheable(url):
+            return
+        stored = {'names': names, 'validators': validators,
+                  'stored': time.time()}
+        try:
+            self._write(self._entry_path(url, '.names'), b(json.dumps(stored)))
+        except (IOError, OSError):
+            e = sys.exc_info()[1]
+            logger.info('Could not store the project names of %s in the index page cache: %s'
+                        % (url, e))
+
+    def get_mirror_stats(self):
+        if self.cache_dir is None:
+            return None
+        try:
+            fp = open(os.path.join(self.cache_dir, self.mirrors_file))
+            try:
+                return json.load(fp)
+            finally:
+                fp.close()
+        except (IOError, OSError, ValueError):
+            return None
+
+    def store_mirror_stats(self, stats):
+        if self.cache_dir is None:
+            return
+        try:
+            self._write(os.path.join(self.cache_dir, self.mirrors_file),
+                        b(json.dumps(stats)))
+        except (IOError, OSError):
+            e = sys.exc_info()[1]
+            logger.info('Could not store mirror stats in the index page cache: %s' % e)
+
+    def _get_dead(self):
+        """The remembered failures, as {'urls': {url: [count, until]},
+        'hosts': {host: [count, until]}}, loaded on first use."""
+        if self._dead is None:
+            dead = None
+            try:
+                fp = open(os.path.join(self.cache_dir, self.failures_file))
+                try:
+                    dead = json.load(fp)
+                finally:
+                    fp.close()
+            except (IOError, OSError, ValueError):
+                pass
+            if not isinstance(dead, dict):
+                dead = {}
+            dead.setdefault('urls', {})
+            dead.setdefault('hosts', {})
+            self._dead = dead
+        return self._dead
+
+    def _save_dead(self):
+        # Forget failures that are long past their backoff
+        expired = time.time() - self.max_failure_backoff
+        for records in self._dead.values():
+            for key, (count, until) in list(records.items()):
+                if until < expired:
+                    del records[key]
+        try:
+            self._write(os.path.join(self.cache_dir, self.failures_file),
+                        b(json.dumps(self._dead)))
+        except (IOError, OSError):
+            e = sys.exc_info()[1]
+            logger.info('Could not store failures in the index page cache: %s' % e)
+
+    @staticmethod
+    def _host(url):
+        return urlparse.urlsplit(url)[1].lower()
+
+    def is_dead(self, url):
+        if not self._is_cacheable(url):
+            return False
+        now = time.time()
+        self._lock.acquire()
+        try:
+            dead = self._get_dead()
+            for records, key in ((dead['urls'], url),
+                                 (dead['hosts'], self._host(url))):
+                record = records.get(key)
+                if record is not None and record[1] > now:
+                    return True
+            return False
+        finally:
+            self._lock.release()
+
+    def add_page_failure(self, url, level, remember=False, host_failure=False):
+        super(DiskPageCache, self).add_page_failure(url, level)
+        if not remember or not self._is_cacheable(url):
+            return
+        now = time.time()
+        self._lock.acquire()
+        try:
+            dead = self._get_dead()
+            keys = [(dead['urls'], url)]
+            if host_failure:
+                keys.append((dead['hosts'], self._host(url)))
+            for records, key in keys:
+                count = records.get(key, [0, 0])[0] + 1
+                backoff = min(self.failure_backoff * 2 ** (count - 1),
+                              self.max_failure_backoff)
+                records[key] = [count, now + backoff]
+            self._save_dead()
+        finally:
+            self._lock.release()
+
+    def add_page(self, urls, page):
+        super(DiskPageCache, self).add_page(urls, page)
+        if self.cache_dir is None:
+            return
+        self._lock.acquire()
+        try:
+            dead = self._get_dead()
+            changed = False
+            for url in urls:
+                for records, key in ((dead['urls'], url),
+                                     (dead['hosts'], self._host(url))):
+                    if key in records:
+                        del records[key]
+                        changed = True
+            if changed:
+                self._save_dead()
+        finally:
+            self._lock.release()
+
+    def _write(self, path, data):
+        """Write `data` to the cache file `path`, and prune the cache if
+        that makes it too large."""
+        try:
+            old_size = os.path.getsize(path)
+        except OSError:
+            old_size = 0
+        atomic_write(path, data)
+        self._size_lock.acquire()
+        try:
+            if self._size is None:
+                self._size = sum([size for key, size, mtime in self._scan()])
+            else:
+                self._size += len(data) - old_size
+            if self._size > self.max_size:
+                self._prune()
+        finally:
+            self._size_lock.release()
+
+    def _scan(self):
+        """Return the (key, size, mtime) of every file in the cache."""
+        files = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            try:
+                size = os.path.getsize(path)
+                mtime = os.path.getmtime(path)
+            except OSError:
+                continue
+            files.append((os.path.splitext(name)[0], size, mtime))
+        return files
+
+    def _prune(self):
+        """Remove least recently stored entries, with all their files,
+        until the cache fits in `prune_ratio` of `max_size`."""
+        entries = {}
+        total = 0
+        for key, size, mtime in self._scan():
+            total += size
+            if len(key) != 40:
+                # failures.json, mirrors.json and temporary files
+                continue
+            entry = entries.setdefault(key, [0, 0])
+            entry[0] = max(entry[0], mtime)
+            entry[1] += size
+        target = self.max_size * self.prune_ratio
+        for key, (mtime, size) in sorted(entries.items(),
+                                         key=lambda item: item[1][0]):
+            if total <= target:
+                break
+            for ext in ('.json', '.html', '.names', '.listing'):
+                try:
+                    os.remove(os.path.join(self.cache_dir, key + ext))
+                except OSError:
+                    pass
+            total -= size
+        self._size = total
+
+
+class LinkParser(object):
+    """Collects the links of an HTML page in a single scan.
+
+    Content can be fed in chunks as it arrives; call close() once it is
+    complete.  Afterwards ``hrefs`` holds the href of every tag, in order,
+    ``rel_hrefs`` the (rels, href) pairs of the tags having a rel attribute,
+    ``base`` the href of the first <base> tag and ``scraped_hrefs`` the
+    first href following the "Home Page" and "Download URL" table headers.
+    """
+
+    ## FIXME: the header markers are horrible hacks:
+    _token_re = re.compile(
+        r'<th>\s*(?:(home\s*page)|(download\s+url))|<([^<>]*)>', re.I)
+    _href_re = re.compile('href=(?:"([^"]*)"|\'([^\']*)\'|([^>\\s\\n]*))', re.I|re.S)
+    _rel_re = re.compile(r"""\srel\s*=\s*['"]?([^'">]+)""", re.I)
+    _base_re = re.compile(r"""base\s+href\s*=\s*['"]?([^'">]+)""", re.I)
+    _markers = ('homepage', 'download')
+
+    def __init__(self):
+        self.hrefs = []
+        self.rel_hrefs = []
+        self.base = None
+        self.scraped_hrefs = {}
+        self._buffer = ''
+        self._pending = []
+        self._seen = set()
+
+    def feed(self, data):
+        buf = self._buffer + data
+        # Tokens cannot contain '<', so everything before the last one is
+        # complete; the rest waits for more data.
+        end = buf.rfind('<')
+        if end == -1:
+            self._buffer = ''
+            return
+        self._scan(buf, end)
+        self._buffer = buf[end:]
+
+    def close(self):
+        buf, self._buffer = self._buffer, ''
+        self._scan(buf, len(buf))
+
+    def _scan(self, buf, end):
+        for match in self._token_re.finditer(buf, 0, end):
+            tag = match.group(3)
+            if tag is None:
+                if match.group(1):
+                    marker = 'homepage'
+                else:
+                    marker = 'download'
+                if marker not in self._seen:
+                    self._seen.add(marker)
+                    self._pending.append(marker)
+                continue
+            if self.base is None and tag[:4].lower() == 'base':
+                base_match = self._base_re.match(tag)
+                if base_match:
+                    self.base = base_match.group(1)
+            href_match = self._href_re.search(tag)
+            if not href_match:
+                continue
+            href = (href_match.group(1) or href_match.group(2)
+                    or href_match.group(3) or '')
+            self.hrefs.append(href)
+            rel_match = self._rel_re.search(tag)
+            if rel_match:
+                self.rel_hrefs.append((rel_match.group(1).lower().split(), href))
+            if self._pending:
+                for marker in self._pending:
+                    self.scraped_hrefs[marker] = href
+                self._pending = []
+
 
 class HTMLPage(object):
     """Represents one page, along with its URL"""
 
-    ## FIXME: these regexes are horrible hacks:
-    _homepage_re = re.compile(r'<th>\s*home\s*page', re.I)
-    _download_re = re.compile(r'<th>\s*download\s+url', re.I)
-    ## These aren't so aweful:
-    _rel_re = re.compile("""<[^>]*\srel\s*=\s*['"]?([^'">]+)[^>]*>""", re.I)
-    _href_re = re.compile('href=(?:"([^"]*)"|\'([^\']*)\'|([^>\\s\\n]*))', re.I|re.S)
-    _base_re = re.compile(r"""<base\s+href\s*=\s*['"]?([^'">]+)""", re.I)
+    chunk_size = 64 * 1024
 
-    def __init__(self, content, url, headers=None):
+    def __init__(self, content, url, headers=None, parser=None):
         self.content = content
         self.url = url
         self.headers = headers
+        self._parser = parser
 
     def __str__(self):
         return self.url
 
     @classmethod
-    def get_page(cls, link, req, cache=None, skip_archives=True):
+    def get_page(cls, link, req, cache=None, skip_archives=True,
+                 remember_failures=False):
         url = link.url
         url = url.split('#', 1)[0]
         if cache.too_many_failures(url):
@@ -502,10 +1645,20 @@ class HTMLPage(object):
                 logger.debug('Cannot look at %(scheme)s URL %(link)s' % locals())
                 return None
 
+        if remember_failures and cache is not None and cache.is_dead(url):
+            logger.info('Skipping URL %s, which failed recently' % link)
+            return None
+
         if cache is not None:
-            inst = cache.get_page(url)
-            if inst is not None:
-                return inst
+            return cache.get_or_fetch(url,
+                lambda: cls._fetch_page(link, url, req, cache, skip_archives,
+                                        remember_failures))
+        return cls._fetch_page(link, url, req, cache, skip_archives,
+                               remember_failures)
+
+    @classmethod
+    def _fetch_page(cls, link, url, req, cache, skip_archives,
+                    remember_failures=False):
         try:
             if skip_archives:
                 if cache is not None:
@@ -533,21 +1686,45 @@ class HTMLPage(object):
                 url = urlparse.urljoin(url, 'index.html')
                 logger.debug(' file: URL is directory, getting %s' % url)
 
-            resp = urlopen(url)
-
-            real_url = geturl(resp)
-            headers = resp.info()
-            contents = resp.read()
-            encoding = headers.get('Content-Encoding', None)
-            #XXX need to handle exceptions and add testing for this
-            if encoding is not None:
-                if encoding == 'gzip':
-                    contents = gzip.GzipFile(fileobj=BytesIO(contents)).read()
-                if encoding == 'deflate':
-                    contents = zlib.decompress(contents)
-            inst = cls(u(contents), real_url, headers)
-        except (HTTPError, URLError, socket.timeout, socket.error, OSError, WindowsError):
+            stored, fresh = None, False
+            if cache is not None:
+                stored, fresh = cache.get_stored_page(url)
+            if fresh:
+                logger.debug('Using cached page %s' % url)
+                cache.add_page([url, stored.url], stored)
+                return stored
+
+            # Index pages compress well; archives are still requested as
+            # they are (see URLOpener.get_request), so their hashes match
+            request_headers = {'Accept-Encoding': 'gzip, deflate'}
+            if stored is not None:
+                if stored.headers.get('ETag'):
+                    request_headers['If-None-Match'] = stored.headers['ETag']
+                if stored.headers.get('Last-Modified'):
+                    request_headers['If-Modified-Since'] = stored.headers['Last-Modified']
+
+            def fetch():
+                resp = urlopen(urllib2.Request(url, headers=request_headers))
+                real_url = geturl(resp)
+                return real_url, cls._read_page(resp, real_url, resp.info())
+            try:
+                real_url, inst = retry_policy.call(fetch)
+            except HTTPError:
+                e = sys.exc_info()[1]
+                if stored is None or e.code != 304:
+                    raise
+                discard_response(e)
+                logger.debug('Page %s not modified, using cached copy' % url)
+                cache.refresh_stored_page(url)
+                cache.add_page([url, stored.url], stored)
+                return stored
+            if cache is not None:
+                cache.store_page(url, inst)
+        except (HTTPError, URLError, socket.timeout, socket.error, OSError,
+                WindowsError, zlib.error):
             e = sys.exc_info()[1]
+            if isinstance(e, HTTPError):
+                discard_response(e)
             desc = str(e)
             if isinstance(e, socket.timeout):
                 log_meth = logger.info
@@ -575,12 +1752,50 @@ class HTMLPage(object):
             log_meth('Could not fetch URL %s: %s' % (link, desc))
             log_meth('Will skip URL %s when looking for download links for %s' % (link.url, req))
             if cache is not None:
-                cache.add_page_failure(url, level)
+                cache.add_page_failure(url, level, remember=remember_failures,
+                                       host_failure=not isinstance(e, (HTTPError, zlib.error)))
             return None
         if cache is not None:
             cache.add_page([url, real_url], inst)
         return inst
 
+    @classmethod
+    def _read_page(cls, resp, url, headers):
+        """Read a page from the response, decompressing and parsing it as it
+        downloads"""
+        decompressor = cls._get_decompressor(headers)
+        decode = u_decoder()
+        parser = LinkParser()
+        chunks = []
+        while True:
+            chunk = resp.read(cls.chunk_size)
+            if not chunk:
+                break
+            if decompressor is not None:
+                chunk = decompressor.decompress(chunk)
+            chunk = decode(chunk)
+            chunks.append(chunk)
+            parser.feed(chunk)
+        if decompressor is not None:
+            chunk = decode(decompressor.flush(), True)
+        else:
+            chunk = decode(b(''), True)
+        chunks.append(chunk)
+        parser.feed(chunk)
+        parser.close()
+        return cls(''.join(chunks), url, headers, parser)
+
+    @staticmethod
+    def _get_decompressor(headers):
+        """Return a zlib decompression object for the Content-Encoding of a
+        response, or None if it is not compressed"""
+        encoding = (headers.get('Content-Encoding') or '').strip().lower()
+        if encoding in ('gzip', 'x-gzip'):
+            return zlib.decompressobj(16 + zlib.MAX_WBITS)
+        if encoding == 'deflate':
+            return DeflateDecompressor()
+        return None
+
     @staticmethod
     def _get_content_type(url):
         """Get the Content-Type of the given url, using a HEAD request"""
@@ -599,23 +1814,26 @@ class HTMLPage(object):
         finally:
             resp.close()
 
+    @property
+    def parsed(self):
+        """The LinkParser holding the links found in this page"""
+        if self._parser is None:
+            parser = LinkParser()
+            parser.feed(self.content)
+            parser.close()
+            self._parser = parser
+        return self._parser
+
     @property
     def base_url(self):
-        if not hasattr(self, "_base_url"):
-            match = self._base_re.search(self.content)
-            if match:
-                self._base_url = match.group(1)
-            else:
-                self._base_url = self.url
-        return self._base_url
+        return self.parsed.base or self.url
 
     @property
     def links(self):
         """Yields all links in the page"""
-        for match in self._href_re.finditer(self.content):
-            url = match.group(1) or match.group(2) or match.group(3)
-            url = self.clean_link(urlparse.urljoin(self.base_url, url))
-            yield Link(url, self)
+        base_url = self.base_url
+        for href in self.parsed.hrefs:
+            yield Link(self.make_url(base_url, href), self)
 
     def rel_links(self):
         for url in self.explicit_rel_links():
@@ -625,33 +1843,65 @@ class HTMLPage(object):
 
     def explicit_rel_links(self, rels=('homepage', 'download')):
         """Yields all links with the given relations"""
-        for match in self._rel_re.finditer(self.content):
-            found_rels = match.group(1).lower().split()
+        base_url = self.base_url
+        for found_rels, href in self.parsed.rel_hrefs:
             for rel in rels:
                 if rel in found_rels:
                     break
             else:
                 continue
-            match = self._href_re.search(match.group(0))
-            if not match:
-                continue
-            url = match.group(1) or match.group(2) or match.group(3)
-            url = self.clean_link(urlparse.urljoin(self.base_url, url))
-            yield Link(url, self)
+            yield Link(self.make_url(base_url, href), self)
 
     def scraped_rel_links(self):
-        for regex in (self._homepage_re, self._download_re):
-            match = regex.search(self.content)
-            if not match:
+        scraped = self.parsed.scraped_hrefs
+        for marker in LinkParser._markers:
+            href = scraped.get(marker)
+            if not href:
                 continue
-            href_match = self._href_re.search(self.content, pos=match.end())
-            if not href_match:
-                continue
-            url = href_match.group(1) or href_match.group(2) or href_match.group(3)
-            if not url:
-                continue
-            url = self.clean_link(urlparse.urljoin(self.base_url, url))
-            yield Link(url, self)
+            yield Link(self.make_url(self.base_url, href), self)
+
+    def link_table(self, finder):
+        """The LinkTable of this page's links, as seen by the given finder.
+        It is built on first use and kept as long as the page is."""
+        key = finder._known_extensions()
+        tables = self.__dict__.setdefault('_link_tables', {})
+        table = tables.get(key)
+        if table is None:
+            table = LinkTable.from_links(finder, finder._sort_links(self.links))
+            tables[key] = table
+        return table
+
+    _absolute_re = re.compile(r'^[a-z][a-z0-9+.-]*://', re.I)
+    _relative_re = re.compile(r'^([^?#]*/)?([^/?#]*)(.*)$', re.S)
+
+    def make_url(self, base_url, href):
+        """Resolves href against base_url and cleans the result"""
+        if not self._absolute_re.match(href):
+            href = self._resolve(base_url, href)
+        return self.clean_link(href)
+
+    def _resolve(self, base_url, href):
+        # Index pages link thousands of files in a handful of directories,
+        # so only resolve each directory once.
+        directory, name, rest = self._relative_re.match(href).groups()
+        directory = directory or ''
+        if (name in ('.', '..') or not (directory or name)
+            or href.startswith('//') or ':' in (directory or name).split('/', 1)[0]):
+            return urlparse.urljoin(base_url, href)
+        prefixes = self.__dict__.setdefault('_prefixes', {})
+        key = (base_url, directory)
+        prefix = prefixes.get(key)
+        if prefix is None:
+            if directory:
+                prefix = urlparse.urljoin(base_url, directory)
+            else:
+                prefix = urlparse.urljoin(base_url, 'x')[:-1]
+            if not prefix.endswith('/'):
+                prefix = ''
+            prefixes[key] = prefix
+        if not prefix:
+            return urlparse.urljoin(base_url, href)
+        return prefix + name + rest
 
     _clean_re = re.compile(r'[^a-z0-9$&+,/:;=?@.#%_\\|-]', re.I)
 
@@ -663,16 +1913,172 @@ class HTMLPage(object):
             lambda match: '%%%2x' % ord(match.group(0)), url)
 
 
+class DeflateDecompressor(object):
+    """Decompresses a "deflate" body, which some servers send as a zlib
+    stream, as the spec says, and others as raw deflate data."""
+
+    def __init__(self):
+        self._decompressor = zlib.decompressobj()
+        self._started = False
+
+    def decompress(self, data):
+        if not self._started and data:
+            self._started = True
+            try:
+                return self._decompressor.decompress(data)
+            except zlib.error:
+                self._decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+        return self._decompressor.decompress(data)
+
+    def flush(self):
+        return self._decompressor.flush()
+
+
+class LinkTable(object):
+    """The distributions a list of links provides, by lower-cased project
+    name.  The (pkg_resources_version_key, link, python_version) triples of
+    a project are parsed and sorted by version the first time it is looked
+    up, so a page can then be queried for many projects and versions
+    without going over its links again."""
+
+    def __init__(self, entries):
+        """`entries` are (search_name, link, python_version) triples, as
+        given by PackageFinder._link_table_entries()."""
+        self._links = {}
+        for name, link, version in entries:
+            self._links.setdefault(name, []).append((link, version))
+        self._versions = {}
+
+    @classmethod
+    def from_links(cls, finder, links):
+        return cls([(name, link, version) for link in links
+                    for name, version in finder._link_table_entries(link)])
+
+    def _get_versions(self, name):
+        versions = self._versions.get(name)
+        if versions is None:
+            triples = [(pkg_resources.parse_version(version), link, version)
+                       for link, version in self._links.get(name, ())
+                       if version is not None]
+            # A stable sort keeps the page order among equal versions
+            triples.sort(key=lambda triple: triple[0])
+            versions = (tuple(triples), [triple[0] for triple in triples])
+            self._versions[name] = versions
+        return versions
+
+    def find(self, name, version=None):
+        """Return the triples for the given project, only those of the given
+        version if one is passed."""
+        triples, keys = self._get_versions(name.lower())
+        if version is None:
+            return list(triples)
+        parsed_version = pkg_resources.parse_version(version)
+        start = bisect.bisect_left(keys, parsed_version)
+        end = bisect.bisect_right(keys, parsed_version, start)
+        return list(triples[start:end])
+
+
+class FindLinksDirectory(object):
+    """The listing of a --find-links directory: the URLs of its archives
+    (`files`) and of its HTML pages (`urls`), and the LinkTable of its
+    archives."""
+
+    def __init__(self, path, mtime, listed, files, urls, entries):
+        self.path = path
+        self.mtime = mtime
+        self.listed = listed
+        self.files = files
+        self.urls = urls
+        # (url, [(search_name, python_version), ...]) for each file
+        self._entries = entries
+        self._link_table = None
+
+    @classmethod
+    def scan(cls, finder, path, mtime):
+        listed = time.time()
+        files = []
+        urls = []
+        entries = []
+        for item in os.listdir(path):
+            url = path_to_url2(os.path.join(path, item))
+            if mimetypes.guess_type(url, strict=False)[0] == 'text/html':
+                urls.append(url)
+            else:
+                files.append(url)
+                entries.append((url, list(finder._link_table_entries(Link(url)))))
+        return cls(path, mtime, listed, files, urls, entries)
+
+    @classmethod
+    def load(cls, listing, path, mtime, config):
+        """Return the directory from a listing stored by dump(), or None if
+        the listing is missing or out of date."""
+        if (not isinstance(listing, dict) or listing.get('path') != path
+            or listing.get('mtime') != mtime or listing.get('config') != config):
+            return None
+        # A listing made within the mtime's resolution might have missed
+        # files added right after it.
+        if listing.get('listed', 0) < mtime + 2:
+            return None
+        try:
+            entries = [(url, [(name, version) for name, version in pairs])
+                       for url, pairs in listing['entries']]
+            return cls(path, mtime, listing['listed'], listing['files'],
+                       listing['urls'], entries)
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    def dump(self, config):
+        return {'path': self.path, 'mtime': self.mtime, 'listed': self.listed,
+                'config': config, 'files': self.files, 'urls': self.urls,
+                'entries': self._entries}
+
+    @property
+    def link_table(self):
+        if self._link_table is None:
+            self._link_table = LinkTable(
+                [(name, link, version) for link, pairs in
+                 [(Link(url), pairs) for url, pairs in self._entries]
+                 for name, version in pairs])
+        return self._link_table
+
+
 class Link(object):
 
+    __slots__ = ('_url', '_split', '_wheel', 'comes_from')
+
     def __init__(self, url, comes_from=None):
         self.url = url
+        if isinstance(comes_from, HTMLPage):
+            # Only the page's URL is shown, don't keep the whole page alive
+            comes_from = comes_from.url
         self.comes_from = comes_from
 
-        # Set whether it's a wheel
-        self.wheel = None
-        if url != Inf and self.splitext()[1] == wheel_ext:
-            self.wheel = Wheel(self.filename)
+    @property
+    def url(self):
+        return self._url
+
+    @url.setter
+    def url(self, url):
+        self._url = url
+        self._split = None
+        self._wheel = False
+
+    def _urlsplit(self):
+        split = self._split
+        if split is None:
+            split = self._split = urlparse.urlsplit(self._url)
+        return split
+
+    @property
+    def wheel(self):
+        """The Wheel this link points to, or None if it isn't a wheel"""
+        wheel = self._wheel
+        if wheel is False:
+            wheel = None
+            if self._url != Inf and self.splitext()[1] == wheel_ext:
+                wheel = Wheel(self.filename)
+            self._wheel = wheel
+        return wheel
 
     def __str__(self):
         if self.comes_from:
@@ -706,25 +2112,25 @@ class Link(object):
 
     @property
     def filename(self):
-        _, netloc, path, _, _ = urlparse.urlsplit(self.url)
+        _, netloc, path, _, _ = self._urlsplit()
         name = posixpath.basename(path.rstrip('/')) or netloc
         assert name, ('URL %r produced no filename' % self.url)
         return name
 
     @property
     def scheme(self):
-        return urlparse.urlsplit(self.url)[0]
+        return self._urlsplit()[0]
 
     @property
     def path(self):
-        return urlparse.urlsplit(self.url)[2]
+        return self._urlsplit()[2]
 
     def splitext(self):
         return splitext(posixpath.basename(self.path.rstrip('/')))
 
     @property
     def url_without_fragment(self):
-        scheme, netloc, path, query, fragment = urlparse.urlsplit(self.url)
+        scheme, netloc, path, query, fragment = self._urlsplit()
         return urlparse.urlunsplit((scheme, netloc, path, query, None))
 
     _egg_fragment_re = re.compile(r'#egg=([^&]*)')
@@ -4,6 +4,11 @@
 import sys
 import logging
 
+try:
+    import threading
+except ImportError:
+    import dummy_threading as threading
+
 from pip import backwardcompat
 
 
@@ -24,11 +29,31 @@ class Logger(object):
 
     def __init__(self):
         self.consumers = []
-        self.indent = 0
+        self._muted = threading.local()
+        self._indent = 0
         self.explicit_levels = False
         self.in_progress = None
         self.in_progress_hanging = False
 
+    def mute(self):
+        """Drop the messages logged by the current thread until unmute(),
+        and keep its changes to the indentation to itself meanwhile."""
+        self._muted.indent = 0
+
+    def unmute(self):
+        del self._muted.indent
+
+    def _get_indent(self):
+        return getattr(self._muted, 'indent', self._indent)
+
+    def _set_indent(self, indent):
+        if hasattr(self._muted, 'indent'):
+            self._muted.indent = indent
+        else:
+            self._indent = indent
+
+    indent = property(_get_indent, _set_indent)
+
     def debug(self, msg, *args, **kw):
         self.log(self.DEBUG, msg, *args, **kw)
 
@@ -53,6 +78,8 @@ class Logger(object):
                 raise TypeError(
                     "You may give positional or keyword arguments, not both")
         args = args or kw
+        if hasattr(self._muted, 'indent'):
+            return
         rendered = None
         for consumer_level, consumer in self.consumers:
             if self.level_matches(level, consumer_level):
@@ -94,5 +94,15 @@ def get_supported(versions=None):
 
     return supported
 
+
+def get_tag_priorities(tags):
+    """Return a dict mapping each tag of the `tags` list to its index, the
+    lowest one for a tag listed several times.  Lower is preferred."""
+    priorities = {}
+    for i, tag in enumerate(tags):
+        priorities.setdefault(tag, i)
+    return priorities
+
 supported_tags = get_supported()
+supported_tag_priorities = get_tag_priorities(supported_tags)
 
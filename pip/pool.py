@@ -0,0 +1,259 @@
+"""A small pool of worker threads for running network lookups in the
+background"""
+
+import sys
+
+try:
+    import threading
+except ImportError:
+    import dummy_threading as threading
+
+from pip.backwardcompat import Queue, urlparse
+
+__all__ = ['CancelledError', 'Future', 'WorkerPool', 'FetchPool']
+
+
+class CancelledError(Exception):
+    """Raised for the result of a call cancelled before it started"""
+
+
+class Future(object):
+    """The eventual outcome of a call submitted to a WorkerPool"""
+
+    def __init__(self):
+        self._done = threading.Event()
+        self._result = None
+        self._exception = None
+        self._callbacks = []
+        self._started = False
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Mark the call as started, unless it was cancelled; return whether
+        it should run."""
+        self._lock.acquire()
+        try:
+            if self._done.isSet():
+                return False
+            self._started = True
+            return True
+        finally:
+            self._lock.release()
+
+    def cancel(self):
+        """Cancel the call if it has not started yet; return whether it
+        was."""
+        self._lock.acquire()
+        try:
+            if self._started or self._done.isSet():
+                return False
+            self._started = True
+        finally:
+            self._lock.release()
+        self.set_exception(CancelledError())
+        return True
+
+    def cancelled(self):
+        return isinstance(self._exception, CancelledError)
+
+    def set_result(self, result):
+        self._result = result
+        self._finish()
+
+    def set_exception(self, exception):
+        self._exception = exception
+        self._finish()
+
+    def _finish(self):
+        self._lock.acquire()
+        try:
+            self._done.set()
+            callbacks, self._callbacks = self._callbacks, []
+        finally:
+            self._lock.release()
+        for callback in callbacks:
+            callback(self)
+
+    def add_done_callback(self, callback):
+        """Call callback(future) once the call has finished, right away if
+        it already has."""
+        self._lock.acquire()
+        try:
+            if not self._done.isSet():
+                self._callbacks.append(callback)
+                return
+        finally:
+            self._lock.release()
+        callback(self)
+
+    def done(self):
+        return self._done.isSet()
+
+    def wait(self, timeout=None):
+        """Wait until the call has finished; return whether it has."""
+        self._done.wait(timeout)
+        return self._done.isSet()
+
+    def result(self):
+        """Wait for the call and return its result, re-raising the
+        exception it raised, if any."""
+        self._done.wait()
+        if self._exception is not None:
+            raise self._exception
+        return self._result
+
+    def exception(self):
+        self._done.wait()
+        return self._exception
+
+
+class WorkerPool(object):
+    """Runs submitted calls on up to `workers` daemon threads, which are
+    started on demand and live until shutdown()."""
+
+    def __init__(self, workers):
+        self.workers = workers
+        self._queue = Queue()
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def submit(self, func, *args, **kwargs):
+        """Schedule func(*args, **kwargs) and return its Future."""
+        future = Future()
+        self._queue.put((future, func, args, kwargs))
+        self._lock.acquire()
+        try:
+            if len(self._threads) < self.workers:
+                t = threading.Thread(target=self._work)
+                t.setDaemon(True)
+                self._threads.append(t)
+                t.start()
+        finally:
+            self._lock.release()
+        return future
+
+    def _work(self):
+        while 1:
+            item = self._queue.get()
+            if item is None:
+                return
+            future, func, args, kwargs = item
+            if not future.start():
+                continue
+            try:
+                result = func(*args, **kwargs)
+            except:
+                future.set_exception(sys.exc_info()[1])
+            else:
+                future.set_result(result)
+
+    def shutdown(self):
+        """Let the workers finish the calls already submitted, then stop
+        them."""
+        self._lock.acquire()
+        try:
+            threads, self._threads = self._threads, []
+        finally:
+            self._lock.release()
+        for t in threads:
+            self._queue.put(None)
+        for t in threads:
+            t.join()
+
+
+class FetchPool(object):
+    """Runs fetches of URLs on up to `workers` daemon threads, with at most
+    `per_host` of them for the same host at a time.
+
+    Fetches for a host at its limit wait for their turn without holding a
+    thread, so the other hosts keep being served.  Threads are started on
+    demand and live until shutdown(), so a single pool can serve a whole
+    command.
+    """
+
+    def __init__(self, workers, per_host):
+        self.workers = workers
+        self.per_host = per_host
+        self._waiting = []
+        self._active = {}
+        self._threads = []
+        self._idle = 0
+        self._stopping = False
+        self._cond = threading.Condition()
+
+    def submit(self, url, func, *args, **kwargs):
+        """Schedule func(*args, **kwargs), which fetches `url`, and return
+        its Future."""
+        future = Future()
+        host = urlparse.urlsplit(url)[1].lower()
+        self._cond.acquire()
+        try:
+            self._waiting.append((host, future, func, args, kwargs))
+            # Idle workers only count as available once they wake up, so
+            # they can't take more than one fetch each of a burst
+            if (len(self._waiting) > self._idle
+                    and len(self._threads) < self.workers):
+                t = threading.Thread(target=self._work)
+                t.setDaemon(True)
+                self._threads.append(t)
+                t.start()
+            self._cond.notifyAll()
+        finally:
+            self._cond.release()
+        return future
+
+    def _next(self):
+        """Take the first waiting fetch whose host is below its limit."""
+        self._waiting = [item for item in self._waiting
+                         if not item[1].done()]
+        for i, item in enumerate(self._waiting):
+            host = item[0]
+            if self._active.get(host, 0) < self.per_host:
+                del self._waiting[i]
+                self._active[host] = self._active.get(host, 0) + 1
+                return item
+        return None
+
+    def _work(self):
+        self._cond.acquire()
+        try:
+            while 1:
+                item = self._next()
+                if item is None:
+                    if self._stopping:
+                        return
+                    self._idle += 1
+                    self._cond.wait()
+                    self._idle -= 1
+                    continue
+                host, future, func, args, kwargs = item
+                self._cond.release()
+                try:
+                    if future.start():
+                        try:
+                            result = func(*args, **kwargs)
+                        except:
+                            future.set_exception(sys.exc_info()[1])
+                        else:
+                            future.set_result(result)
+                finally:
+                    self._cond.acquire()
+                    self._active[host] -= 1
+                    if not self._active[host]:
+                        del self._active[host]
+                    self._cond.notifyAll()
+        finally:
+            self._cond.release()
+
+    def shutdown(self):
+        """Let the workers finish the fetches already submitted, then stop
+        them."""
+        self._cond.acquire()
+        try:
+            self._stopping = True
+            threads, self._threads = self._threads, []
+            self._cond.notifyAll()
+        finally:
+            self._cond.release()
+        for t in threads:
+            t.join()
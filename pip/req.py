@@ -30,7 +30,9 @@ from pip.locations import build_prefix
 from pip.download import (get_file_content, is_url, url_to_path,
                           path_to_url, is_archive_file,
                           unpack_vcs_link, is_vcs_url, is_file_url,
-                          unpack_file_url, unpack_http_url)
+                          unpack_file_url, unpack_http_url, Downloader,
+                          DownloadCache)
+from pip.pool import WorkerPool
 import pip.wheel
 from pip.wheel import move_wheel_files
 
@@ -831,10 +833,12 @@ class RequirementSet(object):
     def __init__(self, build_dir, src_dir, download_dir, download_cache=None,
                  upgrade=False, ignore_installed=False, as_egg=False, target_dir=None,
                  ignore_dependencies=False, force_reinstall=False, use_user_site=False,
-                 skip_reqs={}):
+                 skip_reqs={}, download_workers=0, download_cache_size=None):
         self.build_dir = build_dir
         self.src_dir = src_dir
         self.download_dir = download_dir
+        if download_cache:
+            download_cache = DownloadCache(download_cache, download_cache_size)
         self.download_cache = download_cache
         self.upgrade = upgrade
         self.ignore_installed = ignore_installed
@@ -853,6 +857,15 @@ class RequirementSet(object):
         self.target_dir = target_dir
         # Requirements (by project name) to be skipped
         self.skip_reqs = skip_reqs
+        if download_workers:
+            self.downloader = Downloader(download_workers)
+            self._lookup_pool = WorkerPool(download_workers)
+        else:
+            self.downloader = None
+            self._lookup_pool = None
+        # The background lookups of the links of the requirements to
+        # download early, as (number of dependency links then, Future)
+        self._early_links = {}
 
     def __str__(self):
         reqs = [req for req in self.requirements.values()
@@ -969,11 +982,14 @@ class RequirementSet(object):
         """Prepare process. Create temp directories, download and/or unpack files."""
         unnamed = list(self.unnamed_requirements)
         reqs = list(self.requirements.values())
+        for req in reqs:
+            self._prefetch_requirement(finder, req)
         while reqs or unnamed:
             if unnamed:
                 req_to_install = unnamed.pop(0)
             else:
                 req_to_install = reqs.pop(0)
+            self._start_downloads(finder, reqs)
             install = True
             best_installed = False
             not_found = None
@@ -1063,14 +1079,17 @@ class RequirementSet(object):
                         if req_to_install.url is None:
                             if not_found:
                                 raise not_found
-                            url = finder.find_requirement(req_to_install, upgrade=self.upgrade)
+                            url = self._take_early_link(finder, req_to_install)
+                            if url is None:
+                                url = finder.find_requirement(req_to_install, upgrade=self.upgrade)
                         else:
                             ## FIXME: should req_to_install.url already be a link?
                             url = Link(req_to_install.url)
                             assert url
                         if url:
                             try:
-                                self.unpack_url(url, location, self.is_download)
+                                self.unpack_url(url, location, self.is_download,
+                                                finder.get_mirror_links(url))
                             except HTTPError:
                                 e = sys.exc_info()[1]
                                 logger.fatal('Could not install requirement %s because of error %s'
@@ -1088,6 +1107,7 @@ class RequirementSet(object):
                             for subreq in req_to_install.bundle_requirements():
                                 if self.add_requirement(subreq):
                                     reqs.append(subreq)
+                                    self._prefetch_requirement(finder, subreq)
                         elif is_wheel:
                             req_to_install.source_dir = location
                             req_to_install.url = url.url
@@ -1103,6 +1123,7 @@ class RequirementSet(object):
                                                                 req_to_install)
                                     if self.add_requirement(subreq):
                                         reqs.append(subreq)
+                                        self._prefetch_requirement(finder, subreq)
                         elif self.is_download:
                             req_to_install.source_dir = location
                             req_to_install.run_egg_info()
@@ -1132,8 +1153,8 @@ class RequirementSet(object):
                             else:
                                 install = False
                 if not (is_bundle or is_wheel):
-                    ## FIXME: shouldn't be globally added:
-                    finder.add_dependency_links(req_to_install.dependency_links)
+                    finder.add_dependency_links(req_to_install.dependency_links,
+                                                req_to_install)
                     if (req_to_install.extras):
                         logger.notify("Installing extra requirements: %r" % ','.join(req_to_install.extras))
                     if not self.ignore_dependencies:
@@ -1151,6 +1172,7 @@ class RequirementSet(object):
                             subreq = InstallRequirement(req, req_to_install)
                             if self.add_requirement(subreq):
                                 reqs.append(subreq)
+                                self._prefetch_requirement(finder, subreq)
                     if not self.has_requirement(req_to_install.name):
                         #'unnamed' requirements will get added here
                         self.add_requirement(req_to_install)
@@ -1166,10 +1188,112 @@ class RequirementSet(object):
             finally:
                 logger.indent -= 2
 
+    def _prefetch_requirement(self, finder, req):
+        """Start the index lookup for `req` before its turn comes in
+        prepare_files(), if the finder can do that in the background."""
+        if finder.pool is None:
+            return
+        if req.editable or req.url or req.req is None:
+            return
+        if not (self.upgrade or self.ignore_installed):
+            try:
+                pkg_resources.get_distribution(req.req)
+            except (pkg_resources.DistributionNotFound,
+                    pkg_resources.VersionConflict):
+                pass
+            else:
+                # Already satisfied, so it won't be looked up at all
+                return
+        finder.prefetch_requirement(req)
+
+    def _start_downloads(self, finder, reqs):
+        """Find the archives of the queued `reqs` and start downloading them
+        in the background, ahead of their turn in prepare_files().  Only
+        requirements that are not installed yet are looked up this early;
+        the others, and those whose lookup fails, are left to
+        prepare_files() as usual.
+
+        The lookups run in the background too, and are started again when
+        the finder has been given dependency links since, as those may
+        change the archive found."""
+        if self.downloader is None:
+            return
+        links_seen = len(finder.dependency_links)
+        for req in reqs:
+            if req.editable:
+                continue
+            early = self._early_links.get(req)
+            if early is not None:
+                if early[0] == links_seen:
+                    continue
+                early[1].cancel()
+            self._early_links[req] = (links_seen, self._lookup_pool.submit(
+                self._start_early_download, finder, req))
+
+    def _start_early_download(self, finder, req):
+        # Its messages would be mixed up with the foreground's; failed
+        # lookups are done again, and reported, when their turn comes
+        logger.mute()
+        try:
+            link = self._find_early_link(finder, req)
+        finally:
+            logger.unmute()
+        if link is not None and not (is_vcs_url(link) or is_file_url(link)):
+            self.downloader.start(link, self.download_cache, self.download_dir)
+        return link
+
+    def _take_early_link(self, finder, req):
+        """Return the link found ahead for `req`, or None if there is none,
+        or if it was looked up before the finder's latest dependency
+        links."""
+        early = self._early_links.pop(req, None)
+        if early is None:
+            return None
+        links_seen, future = early
+        if links_seen != len(finder.dependency_links):
+            future.cancel()
+            return None
+        try:
+            return future.result()
+        except Exception:
+            # The lookup is done again, reporting the error as usual
+            return None
+
+    def _find_early_link(self, finder, req):
+        if req.url:
+            return Link(req.url)
+        if req.req is None:
+            return None
+        if not self.ignore_installed:
+            try:
+                pkg_resources.get_distribution(req.req.project_name)
+            except pkg_resources.DistributionNotFound:
+                pass
+            else:
+                return None
+        try:
+            return finder.find_requirement(req, self.upgrade)
+        except (DistributionNotFound, BestVersionAlreadyInstalled):
+            return None
+
+    def shutdown(self):
+        """Stop the background lookups and downloads, leaving the files of
+        those done to cleanup_files()."""
+        if self.downloader is None:
+            return
+        for links_seen, future in self._early_links.values():
+            future.cancel()
+        self._early_links = {}
+        self._lookup_pool.shutdown()
+        self.downloader.shutdown()
+
     def cleanup_files(self, bundle=False):
         """Clean up files, remove builds."""
         logger.notify('Cleaning up...')
         logger.indent += 2
+        if self.downloader is not None:
+            self.shutdown()
+            self.downloader.cleanup()
         for req in self.reqs_to_cleanup:
             req.remove_temporary_source()
 
@@ -1201,7 +1325,7 @@ class RequirementSet(object):
         call_subprocess(["python", "%s/setup.py" % dest, "clean"], cwd=dest,
                         command_desc='python setup.py clean')
 
-    def unpack_url(self, link, location, only_download=False):
+    def unpack_url(self, link, location, only_download=False, mirror_links=()):
         if only_download:
             loc = self.download_dir
         else:
@@ -1212,9 +1336,9 @@ class RequirementSet(object):
         elif not link.hash and is_file_url(link):
             return unpack_file_url(link, loc)
         else:
-            if self.download_cache:
-                self.download_cache = os.path.expanduser(self.download_cache)
-            retval = unpack_http_url(link, location, self.download_cache, self.download_dir)
+            retval = unpack_http_url(link, location, self.download_cache,
+                                     self.download_dir, self.downloader,
+                                     mirror_links)
             if only_download:
                 write_delete_marker_file(location)
             return retval
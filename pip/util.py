@@ -2,6 +2,7 @@ import sys
 import shutil
 import os
 import stat
+import tempfile
 import re
 import posixpath
 import pkg_resources
@@ -23,9 +24,10 @@ __all__ = ['rmtree', 'display_path', 'backup_dir',
            'is_svn_page', 'file_contents',
            'split_leading_dir', 'has_leading_dir',
            'make_path_relative', 'normalize_path',
-           'renames', 'get_terminal_size', 'get_prog',
+           'renames', 'atomic_write', 'read_chunks', 'copy_file',
+           'get_terminal_size', 'get_prog',
            'unzip_file', 'untar_file', 'create_download_cache_folder',
-           'cache_download', 'unpack_file', 'call_subprocess']
+           'unpack_file', 'call_subprocess']
 
 
 def get_prog():
@@ -301,6 +303,102 @@ def renames(old, new):
             pass
 
 
+def atomic_write(path, data):
+    """Write the bytes `data` to `path` so that concurrent readers see
+    either the old file or the complete new one, never a partial write."""
+    fd, temp_path = tempfile.mkstemp(prefix='.tmp-', dir=os.path.dirname(path))
+    try:
+        fp = os.fdopen(fd, 'wb')
+        try:
+            fp.write(data)
+        finally:
+            fp.close()
+        if sys.platform == 'win32' and os.path.exists(path):
+            # os.rename() can't replace an existing file on Windows
+            os.remove(path)
+        os.rename(temp_path, path)
+    except:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+#: Size of the buffers used to read, hash and copy archives
+IO_BUFFER_SIZE = 1024 * 1024
+
+
+def read_chunks(fp, size=IO_BUFFER_SIZE):
+    """Yield the rest of the file `fp`, `size` bytes at a time.
+
+    Where `fp` supports it, the chunks are read into a single buffer and
+    are memoryviews of it: each is only valid until the next one is read.
+    """
+    readinto = getattr(fp, 'readinto', None)
+    try:
+        view = memoryview(bytearray(size))
+    except NameError:
+        # Python 2.6
+        readinto = None
+    if readinto is None:
+        while True:
+            chunk = fp.read(size)
+            if not chunk:
+                break
+            yield chunk
+        return
+    while True:
+        read = readinto(view)
+        if not read:
+            break
+        yield view[:read]
+
+
+def _sendfile(fsrc, fdst):
+    """Copy the file `fsrc` to `fdst` without reading it into Python, with
+    os.sendfile(); return whether it could."""
+    sendfile = getattr(os, 'sendfile', None)
+    if sendfile is None:
+        return False
+    offset = 0
+    while True:
+        try:
+            sent = sendfile(fdst.fileno(), fsrc.fileno(), offset,
+                            8 * IO_BUFFER_SIZE)
+        except OSError:
+            if offset:
+                raise
+            # Not supported for these files
+            return False
+        if not sent:
+            return True
+        offset += sent
+
+
+def copy_file(src, dst, hardlink=False):
+    """Copy the file `src` to `dst` with its permission bits, like
+    shutil.copy(), but in the kernel where possible.  With `hardlink`,
+    make `dst` a hard link to `src` instead if they are on the same file
+    system."""
+    if hardlink and hasattr(os, 'link'):
+        try:
+            os.link(src, dst)
+            return
+        except OSError:
+            pass
+    fsrc = open(src, 'rb')
+    try:
+        fdst = open(dst, 'wb')
+        try:
+            if not _sendfile(fsrc, fdst):
+                for chunk in read_chunks(fsrc):
+                    fdst.write(chunk)
+        finally:
+            fdst.close()
+    finally:
+        fsrc.close()
+    shutil.copymode(src, dst)
+
+
 def is_local(path):
     """
     Return True if path is within sys.prefix, if we're running in a virtualenv.
@@ -576,15 +674,6 @@ def create_download_cache_folder(folder):
     os.makedirs(folder)
 
 
-def cache_download(target_file, temp_location, content_type):
-    logger.notify('Storing download in cache at %s' % display_path(target_file))
-    shutil.copyfile(temp_location, target_file)
-    fp = open(target_file+'.content-type', 'w')
-    fp.write(content_type)
-    fp.close()
-    os.unlink(temp_location)
-
-
 def unpack_file(filename, location, content_type, link):
     filename = os.path.realpath(filename)
     if (content_type == 'application/zip'
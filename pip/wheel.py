@@ -15,6 +15,7 @@ from base64 import urlsafe_b64encode
 
 from pip.locations import distutils_scheme
 from pip.log import logger
+from pip import pep425tags
 from pip.pep425tags import supported_tags
 from pip.util import call_subprocess, normalize_path, make_path_relative
 
@@ -236,18 +237,24 @@ class Wheel(object):
         self.file_tags = set((x, y, z) for x in self.pyversions for y
                             in self.abis for z in self.plats)
 
+        if supported_tags is pep425tags.supported_tags:
+            priorities = pep425tags.supported_tag_priorities
+        else:
+            priorities = pep425tags.get_tag_priorities(supported_tags)
+        indexes = [priorities[c] for c in self.file_tags if c in priorities]
+        self._support_index_min = min(indexes) if indexes else None
+
     def support_index_min(self):
         """
         Return the lowest index that a file_tag achieves in the supported_tags list
         e.g. if there are 8 supported tags, and one of the file tags is first in the
         list, then return 0.
         """
-        indexes = [supported_tags.index(c) for c in self.file_tags if c in supported_tags]
-        return min(indexes) if indexes else None
+        return self._support_index_min
 
     def supported(self):
         """Is this wheel supported on this system?"""
-        return bool(set(supported_tags).intersection(self.file_tags))
+        return self._support_index_min is not None
 
 
 class WheelBuilder(object):
@@ -1,8 +1,11 @@
 import os
+import threading
+from shutil import rmtree
+from tempfile import mkdtemp
 from pkg_resources import parse_version
 from pip.backwardcompat import urllib
 from pip.req import InstallRequirement
-from pip.index import PackageFinder, Link
+from pip.index import PackageFinder, Link, HTMLPage
 from pip.exceptions import BestVersionAlreadyInstalled, DistributionNotFound
 from pip.util import Inf
 from tests.lib.path import Path
@@ -113,6 +116,46 @@ def test_finder_priority_page_over_deplink():
     assert link.url.startswith("https://pypi"), link
 
 
+def test_dependency_link_pages_apply_to_dependencies_first():
+    """
+    Test a page from dependency_links is searched for the dependencies of
+    the requirement declaring it, and for unrelated requirements only when
+    they aren't found otherwise
+    """
+    page = path_to_url(os.path.join(tests_data, 'indexes', 'simple', 'simple'))
+    parent = InstallRequirement.from_line('parent', None)
+    finder = PackageFinder([], [])
+    finder.add_dependency_links([page], parent)
+    child = InstallRequirement('simple', parent)
+    grandchild = InstallRequirement('simple', InstallRequirement('child', parent))
+    assert finder.find_requirement(child, False).filename == 'simple-1.0.tar.gz'
+    assert finder.find_requirement(grandchild, False).filename == 'simple-1.0.tar.gz'
+    unrelated = InstallRequirement.from_line('simple', None)
+    assert finder.find_requirement(unrelated, False).filename == 'simple-1.0.tar.gz'
+    finder.find_links = [find_links]
+    with patch.object(finder, '_search_pages', return_value=[]) as mock_search:
+        assert finder.find_requirement(unrelated, False).filename == 'simple-3.0.tar.gz'
+    assert mock_search.call_count == 1
+    finder.find_links = []
+    finder.add_dependency_links([page])
+    assert finder._get_locations(unrelated) == [page]
+
+
+def test_dependency_links_to_archives_apply_to_their_project_only():
+    links = ['http://host/simple-1.0.tar.gz', 'http://host/other-1.0.tar.gz',
+             'http://host/trunk#egg=simple-dev']
+    finder = PackageFinder([], [])
+    finder.add_dependency_links(links, InstallRequirement.from_line('parent', None))
+    req = InstallRequirement.from_line('simple', None)
+    assert sorted([link.url for parsed, link, version in finder._dependency_versions(req)]) == [
+        'http://host/simple-1.0.tar.gz', 'http://host/trunk#egg=simple-dev']
+    assert finder._get_locations(req) == []
+    with patch.object(finder, '_get_page') as mock_get_page:
+        link = finder.find_requirement(req, False)
+    assert link.url == 'http://host/simple-1.0.tar.gz'
+    assert not mock_get_page.called
+
+
 def test_finder_priority_nonegg_over_eggfragments():
     """Test PackageFinder prefers non-egg links over "#egg=" links"""
     req = InstallRequirement.from_line('bar==1.0', None)
@@ -259,3 +302,206 @@ def test_link_sorting():
     results2 = finder._sort_versions(sorted(links, reverse=True))
 
     assert links == results == results2, results2
+
+
+def test_prefetch_requirement_caches_pages():
+    """Test index pages are fetched ahead of find_requirement"""
+    index_url = path_to_url(os.path.join(tests_data, 'indexes', 'simple'))
+    finder = PackageFinder([], [index_url], resolve_workers=2)
+    req = InstallRequirement.from_line('simple==1.0', None)
+    finder.prefetch_requirement(req)
+    assert finder._prefetched['simple'].wait(10)
+    assert finder.cache.get_page(index_url + '/simple/index.html')
+
+    link = finder.find_requirement(req, False)
+    assert link.filename == 'simple-1.0.tar.gz'
+
+
+def test_shutdown_stops_worker_threads():
+    """Test shutdown() drops the pending prefetches and stops the threads"""
+    index_url = path_to_url(os.path.join(tests_data, 'indexes', 'simple'))
+    finder = PackageFinder([], [index_url], resolve_workers=1)
+    finder.find_requirement(InstallRequirement.from_line('simple', None), False)
+    started = threading.Event()
+    release = threading.Event()
+
+    def prefetch_pages(req):
+        started.set()
+        release.wait(10)
+    with patch.object(finder, '_prefetch_pages', prefetch_pages):
+        finder.prefetch_requirement(InstallRequirement.from_line('simple', None))
+        finder.prefetch_requirement(InstallRequirement.from_line('other', None))
+        assert started.wait(10)
+        release.set()
+        finder.shutdown()
+    assert finder._prefetched['other'].cancelled()
+    assert not finder.pool._threads
+    assert not finder.fetcher._threads
+
+
+def test_prefetch_requirement_without_workers():
+    finder = PackageFinder([], [])
+    finder.prefetch_requirement(InstallRequirement.from_line('simple', None))
+    assert not finder._prefetched
+
+
+def test_page_link_table():
+    """
+    Test a page's links are looked up by project name and version
+    """
+    page = HTMLPage("""
+        <a href="foo-1.0.tar.gz">foo-1.0.tar.gz</a>
+        <a href="foo-bar-2.0.zip">foo-bar-2.0.zip</a>
+        <a href="foo-2.0.tar.gz">foo-2.0.tar.gz</a>
+        <a href="foo-3.0.exe">foo-3.0.exe</a>
+        <a href="other.tar.gz#egg=foo-1.0">foo-1.0</a>
+        """, "http://pypi/simple/foo/")
+    finder = PackageFinder([], [])
+    table = page.link_table(finder)
+    assert page.link_table(finder) is table
+    assert [(link.filename, version) for parsed, link, version in table.find('Foo')] == [
+        ('foo-bar-2.0.zip', 'bar-2.0'),
+        ('foo-1.0.tar.gz', '1.0'),
+        ('other.tar.gz', '1.0'),
+        ('foo-2.0.tar.gz', '2.0'),
+        ]
+    assert [link.filename for parsed, link, version in table.find('foo-bar')] == [
+        'foo-bar-2.0.zip',
+        ]
+    assert [link.filename for parsed, link, version in table.find('foo', '2.0')] == [
+        'foo-2.0.tar.gz',
+        ]
+    assert table.find('bar') == []
+
+
+def test_exact_pin_found_locally_skips_indexes():
+    """
+    Test an exact pin found in the find-links doesn't fetch any index page
+    """
+    req = InstallRequirement.from_line('simple==2.0', None)
+    finder = PackageFinder([find_links], ["http://pypi.python.org/simple"])
+    with patch.object(finder, '_get_page') as mock_get_page:
+        link = finder.find_requirement(req, False)
+    assert link.filename == 'simple-2.0.tar.gz'
+    assert not mock_get_page.called
+
+
+def test_exact_pin_found_in_index_page_skips_crawl():
+    """
+    Test an exact pin found in the index page doesn't crawl further
+    """
+    index_url = path_to_url(os.path.join(tests_data, 'indexes', 'simple'))
+    req = InstallRequirement.from_line('simple==1.0', None)
+    finder = PackageFinder([], [index_url])
+    with patch.object(finder, '_get_pages') as mock_get_pages:
+        link = finder.find_requirement(req, False)
+    assert link.filename == 'simple-1.0.tar.gz'
+    assert not mock_get_pages.called
+
+
+@patch('pip.wheel.supported_tags', [('py2', 'none', 'any')])
+def test_exact_pin_sdist_is_not_enough_with_wheels():
+    """
+    Test an exact pin only found as an sdist is searched for everywhere
+    when wheels are preferred
+    """
+    sdist = path_to_url(os.path.join(find_links, 'priority-1.0.tar.gz'))
+    req = InstallRequirement.from_line('priority==1.0', None)
+    finder = PackageFinder([sdist], [], use_wheel=True)
+    assert finder._find_pinned_requirement(req, '1.0', []) is None
+    assert finder.find_requirement(req, False).url == sdist
+    finder = PackageFinder([find_links], [], use_wheel=True)
+    assert finder.find_requirement(req, False).wheel
+
+
+class TestNameIndex(object):
+
+    index_url = 'http://pypi/simple/'
+    root = HTMLPage('<a href="Django/">Django</a><a href="Foo_Bar/">Foo_Bar</a>',
+                    index_url, {'ETag': '"v1"'})
+
+    def setup(self):
+        self.cache_dir = mkdtemp()
+
+    def teardown(self):
+        rmtree(self.cache_dir)
+
+    def find_url_name(self, finder, name):
+        req = InstallRequirement.from_line(name, None)
+        return finder._find_url_name(Link(self.index_url), req.url_name, req)
+
+    def test_root_page_is_read_once_per_run(self):
+        finder = PackageFinder([], [self.index_url])
+        with patch.object(finder, '_get_page', return_value=self.root) as mock_get_page:
+            assert self.find_url_name(finder, 'django') == 'Django'
+            assert self.find_url_name(finder, 'foo-bar') == 'Foo_Bar'
+            assert self.find_url_name(finder, 'missing') is None
+        assert mock_get_page.call_count == 1
+
+    def test_stored_names_are_reused_in_later_runs(self):
+        finder = PackageFinder([], [self.index_url], index_cache=self.cache_dir)
+        with patch.object(finder, '_get_page', return_value=self.root):
+            assert self.find_url_name(finder, 'DJANGO') == 'Django'
+        finder = PackageFinder([], [self.index_url], index_cache=self.cache_dir)
+        with patch.object(finder, '_get_page') as mock_get_page:
+            assert self.find_url_name(finder, 'foo.bar') == 'Foo_Bar'
+        assert not mock_get_page.called
+
+    def test_stale_names_are_kept_while_root_page_is_unchanged(self):
+        finder = PackageFinder([], [self.index_url], index_cache=self.cache_dir)
+        finder.cache.names_max_age = 0
+        with patch.object(finder, '_get_page', return_value=self.root):
+            self.find_url_name(finder, 'django')
+        changed = HTMLPage('<a href="Django/">Django</a>', self.index_url,
+                           {'ETag': '"v1"'})
+        finder = PackageFinder([], [self.index_url], index_cache=self.cache_dir)
+        finder.cache.names_max_age = 0
+        with patch.object(finder, '_get_page', return_value=changed):
+            assert self.find_url_name(finder, 'foo-bar') == 'Foo_Bar'
+        changed.headers = {'ETag': '"v2"'}
+        finder = PackageFinder([], [self.index_url], index_cache=self.cache_dir)
+        finder.cache.names_max_age = 0
+        with patch.object(finder, '_get_page', return_value=changed):
+            assert self.find_url_name(finder, 'foo-bar') is None
+
+
+class TestIndexStrategy(object):
+
+    pages = {
+        'http://primary/simple/simple/': '<a href="/simple-1.0.tar.gz">simple-1.0.tar.gz</a>',
+        'http://public/simple/simple/': '<a href="/simple-2.0.tar.gz">simple-2.0.tar.gz</a>',
+        }
+
+    def find(self, line, strategy):
+        finder = PackageFinder([], ['http://primary/simple/', 'http://public/simple/'],
+                               index_strategy=strategy)
+        fetched = []
+
+        def get_page(link, req, remember_failures=False):
+            fetched.append(link.url)
+            if link.url in self.pages:
+                return HTMLPage(self.pages[link.url], link.url)
+        with patch.object(finder, '_get_page', side_effect=get_page):
+            link = finder.find_requirement(InstallRequirement.from_line(line, None), False)
+        return link.url, set(fetched)
+
+    def test_all_indexes_are_searched_by_default(self):
+        url, fetched = self.find('simple', 'all')
+        assert url == 'http://public/simple-2.0.tar.gz'
+
+    def test_first_match_skips_lower_priority_indexes(self):
+        url, fetched = self.find('simple', 'first-match')
+        assert url == 'http://primary/simple-1.0.tar.gz'
+        assert fetched == set(['http://primary/simple/simple/'])
+
+    def test_first_match_falls_back_on_a_miss(self):
+        url, fetched = self.find('simple>1.0', 'first-match')
+        assert url == 'http://public/simple-2.0.tar.gz'
+        url, fetched = self.find('simple==2.0', 'first-match')
+        assert url == 'http://public/simple-2.0.tar.gz'
+
+    def test_first_match_parallel(self):
+        url, fetched = self.find('simple==1.0', 'first-match-parallel')
+        assert url == 'http://primary/simple-1.0.tar.gz'
+        url, fetched = self.find('simple>1.0', 'first-match-parallel')
+        assert url == 'http://public/simple-2.0.tar.gz'
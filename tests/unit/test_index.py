@@ -1,11 +1,18 @@
 import os
-from pip.backwardcompat import urllib
+import threading
+import time
+import zlib
+from shutil import rmtree
+from tempfile import mkdtemp
+from pip.backwardcompat import urllib, HTTPError, URLError, BytesIO, b, u
 from tests.lib.path import Path
 from pip.index import package_to_requirement, HTMLPage, get_mirrors, DEFAULT_MIRROR_HOSTNAME
-from pip.index import PackageFinder, Link, InfLink
-from tests.lib import reset_env, run_pip, pyversion, tests_data, path_to_url, find_links
+from pip.index import PackageFinder, Link, InfLink, PageCache, DiskPageCache, LinkParser
+from pip.index import MirrorSelector
+from tests.lib import (reset_env, run_pip, pyversion, tests_data, path_to_url, find_links,
+                       assert_raises_regexp)
 from string import ascii_lowercase
-from mock import patch
+from mock import Mock, patch
 
 
 def test_package_name_should_be_converted_to_requirement():
@@ -33,6 +40,64 @@ def test_html_page_should_be_able_to_scrap_rel_links():
     assert len(links) == 1
     assert links[0].url == 'http://supervisord.org/'
 
+
+def test_html_page_links_rel_links_and_base():
+    """
+    Test links, rel links and <base> are found in a single scan
+    """
+    page = HTMLPage("""
+        <base href="http://example.com/files/">
+        <a href="foo-1.0.tar.gz#md5=abc">foo-1.0.tar.gz</a>
+        <a rel="download" href='../foo-2.0.zip'>download</a>
+        <a rel="internal" href=http://other.com/foo-3.0.tar.gz>foo</a>
+        <a href="foo bar.zip">x</a>""", "http://example.com/simple/foo/")
+    assert [link.url for link in page.links] == [
+        'http://example.com/files/',
+        'http://example.com/files/foo-1.0.tar.gz#md5=abc',
+        'http://example.com/foo-2.0.zip',
+        'http://other.com/foo-3.0.tar.gz',
+        'http://example.com/files/foo%20bar.zip',
+    ]
+    assert [link.url for link in page.explicit_rel_links()] == [
+        'http://example.com/foo-2.0.zip',
+    ]
+
+
+def test_html_page_empty_href():
+    """
+    Test an empty href links to the page itself, and isn't scraped
+    """
+    page = HTMLPage("""
+        <th>Home Page</th><td><a href="">x</a>
+        <a rel="download" href=''>y</a>""", "http://example.com/simple/foo/")
+    assert [link.url for link in page.links] == [
+        'http://example.com/simple/foo/',
+        'http://example.com/simple/foo/',
+    ]
+    assert list(page.scraped_rel_links()) == []
+
+
+def test_link_parser_handles_content_split_in_chunks():
+    """
+    Test feeding the parser a page one character at a time gives the
+    same links as parsing it in one go
+    """
+    content = """
+        <table><tr><th>Home Page</th><td><a href="http://example.com/">x</a>
+        <tr><th>Download URL</th><td><a href="/dl/foo-1.0.tar.gz">y</a>
+        <a rel="homepage" href="/home">home</a></table>"""
+    parser = LinkParser()
+    for char in content:
+        parser.feed(char)
+    parser.close()
+    page = HTMLPage(content, "http://example.com/simple/foo/", parser=parser)
+    assert parser.hrefs == HTMLPage(content, page.url).parsed.hrefs
+    assert [link.url for link in page.rel_links()] == [
+        'http://example.com/home',
+        'http://example.com/',
+        'http://example.com/dl/foo-1.0.tar.gz',
+    ]
+
 @patch('socket.gethostbyname_ex')
 def test_get_mirrors(mock_gethostbyname_ex):
     # Test when the expected result comes back
@@ -78,11 +143,114 @@ def test_sort_locations_file_not_find_link():
     assert urls and not files, "urls, but not files should have been found"
 
 
+class TestFindLinksDirectory(object):
+
+    def setup(self):
+        self.find_links_dir = mkdtemp()
+        self.cache_dir = mkdtemp()
+        for name in ('simple-1.0.tar.gz', 'simple-2.0.tar.gz', 'index.html'):
+            open(os.path.join(self.find_links_dir, name), 'w').close()
+        # Listings taken within a second or two of a change aren't trusted
+        os.utime(self.find_links_dir, (1000000000, 1000000000))
+
+    def teardown(self):
+        rmtree(self.find_links_dir)
+        rmtree(self.cache_dir)
+
+    def test_listing_is_shared_and_stored(self):
+        """
+        Test a find-links directory is listed once per run and its stored
+        listing is reused by later runs
+        """
+        finder = PackageFinder([self.find_links_dir], [], index_cache=self.cache_dir)
+        files, urls = finder._sort_locations([self.find_links_dir])
+        assert sorted([url.rsplit('/', 1)[1] for url in files]) == [
+            'simple-1.0.tar.gz', 'simple-2.0.tar.gz']
+        assert [url.rsplit('/', 1)[1] for url in urls] == ['index.html']
+
+        with patch('os.listdir') as mock_listdir:
+            assert finder._sort_locations([self.find_links_dir]) == (files, urls)
+            finder = PackageFinder([self.find_links_dir], [], index_cache=self.cache_dir)
+            versions = finder._local_versions([self.find_links_dir], 'simple')
+            assert not mock_listdir.called
+        assert sorted([version for parsed, link, version in versions]) == ['1.0', '2.0']
+        assert [version for parsed, link, version in
+                finder._local_versions([self.find_links_dir], 'simple', '2.0')] == ['2.0']
+
+    def test_listing_is_refreshed_when_directory_changes(self):
+        finder = PackageFinder([self.find_links_dir], [], index_cache=self.cache_dir)
+        assert len(finder._local_versions([self.find_links_dir], 'simple')) == 2
+        open(os.path.join(self.find_links_dir, 'simple-3.0.tar.gz'), 'w').close()
+        os.utime(self.find_links_dir, (1000000100, 1000000100))
+        assert len(finder._local_versions([self.find_links_dir], 'simple')) == 3
+        finder = PackageFinder([self.find_links_dir], [], index_cache=self.cache_dir)
+        assert len(finder._local_versions([self.find_links_dir], 'simple')) == 3
+
+
 def test_inflink_greater():
     """Test InfLink compares greater."""
     assert InfLink > Link("some link")
 
 
+def test_link_keeps_only_page_url():
+    """
+    Test a link found in a page refers to the page by its URL only
+    """
+    page = HTMLPage('<a href="simple-1.0.tar.gz">', 'http://pypi/simple/simple/')
+    link = list(page.links)[0]
+    assert link.comes_from == 'http://pypi/simple/simple/'
+    assert str(link) == 'http://pypi/simple/simple/simple-1.0.tar.gz (from http://pypi/simple/simple/)'
+
+
+def test_link_url_change_resets_parsed_parts():
+    link = Link('http://pypi/simple/simple-1.0-py2.py3-none-any.whl')
+    assert link.filename == 'simple-1.0-py2.py3-none-any.whl'
+    assert link.wheel.version == '1.0'
+    link.url = 'http://pypi/simple/simple-2.0.tar.gz'
+    assert link.filename == 'simple-2.0.tar.gz'
+    assert link.wheel is None
+
+
+def compressed_response(url, body, encoding):
+    resp = Mock()
+    resp.read = BytesIO(body).read
+    resp.info.return_value = {'Content-Encoding': encoding}
+    resp.geturl.return_value = url
+    return resp
+
+
+@patch('pip.index.urlopen')
+def test_index_pages_are_fetched_compressed(mock_urlopen):
+    """
+    Test index pages are asked for compressed and decompressed as they
+    are read, whichever variant of deflate the server uses
+    """
+    url = 'http://pypi/simple/simple/'
+    html = b('<a href="simple-1.0.tar.gz">simple-1.0.tar.gz</a>' * 2000)
+    gzipper = zlib.compressobj(9, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    raw = zlib.compressobj(9, zlib.DEFLATED, -zlib.MAX_WBITS)
+    for body, encoding in [
+            (gzipper.compress(html) + gzipper.flush(), 'gzip'),
+            (zlib.compress(html), 'deflate'),
+            (raw.compress(html) + raw.flush(), 'deflate')]:
+        mock_urlopen.return_value = compressed_response(url, body, encoding)
+        with patch.object(HTMLPage, 'chunk_size', 100):
+            page = HTMLPage.get_page(Link(url), None, cache=PageCache())
+        request = mock_urlopen.call_args[0][0]
+        assert request.get_header('Accept-encoding') == 'gzip, deflate'
+        assert page.content == u(html)
+        assert len(list(page.links)) == 2000
+
+
+@patch('pip.index.urlopen')
+def test_corrupt_compressed_page_is_a_failure(mock_urlopen):
+    url = 'http://pypi/simple/simple/'
+    mock_urlopen.return_value = compressed_response(url, b('not gzip'), 'gzip')
+    cache = PageCache()
+    assert HTMLPage.get_page(Link(url), None, cache=cache) is None
+    assert cache._failures[url] == 1
+
+
 def test_mirror_url_formats():
     """
     Test various mirror formats get transformed properly
@@ -102,4 +270,293 @@ def test_mirror_url_formats():
             assert url == result, str([url, result])
 
 
+class TestMirrorSelector(object):
+
+    index = 'http://pypi/simple/'
+    fast = 'http://fast/simple/'
+    slow = 'http://slow/simple/'
+
+    def setup(self):
+        self.cache = DiskPageCache(mkdtemp())
+
+    def teardown(self):
+        rmtree(self.cache.cache_dir)
+
+    def selector(self, samples):
+        """Make a selector whose stored stats give each replica `samples`."""
+        self.cache.store_mirror_stats({'probed': time.time(), 'replicas': dict(
+            (url, {'samples': samples[url], 'failures': 0}) for url in samples)})
+        return MirrorSelector(self.index.rstrip('/'), [self.fast, self.slow], self.cache)
+
+    def test_replicas_are_ranked_by_latency_then_health(self):
+        selector = self.selector({self.index: [0.5, 0.4, 3],
+                                  self.fast: [0.1, 0.2, 9],
+                                  self.slow: [2, 2]})
+        assert selector.ranked() == [self.fast, self.index, self.slow]
+        selector.record(self.fast, None)
+        assert selector.ranked() == [self.index, self.slow, self.fast]
+        selector.record(self.fast, 0.1)
+        assert selector.ranked()[0] == self.fast
+
+    def test_hedge_delay_is_latency_percentile(self):
+        selector = self.selector({self.index: [i / 10.0 for i in range(1, 11)],
+                                  self.fast: [], self.slow: [0]})
+        assert selector.hedge_delay(self.index) == 0.9
+        assert selector.hedge_delay(self.fast) == selector.default_hedge_delay
+        assert selector.hedge_delay(self.slow) == selector.min_hedge_delay
+
+    def test_slow_replica_is_hedged(self):
+        """
+        Test the next replica is asked when the fastest is late, and the
+        first page to arrive is used
+        """
+        selector = self.selector({self.index: [1, 1], self.fast: [0.1, 0.1],
+                                  self.slow: [2, 2]})
+        release = threading.Event()
+        asked = []
+
+        def fetch(link):
+            asked.append(link.url)
+            if link.url.startswith(self.fast):
+                release.wait(10)
+            return HTMLPage('', link.url)
+        page = selector.get_page(self.index + 'simple/', fetch)
+        release.set()
+        assert page.url == self.index + 'simple/'
+        assert asked == [self.fast + 'simple/', self.index + 'simple/']
+
+    def test_failed_replica_moves_on_at_once(self):
+        selector = self.selector({self.index: [1], self.fast: [0.1], self.slow: [2]})
+        asked = []
+
+        def fetch(link):
+            asked.append(link.url)
+            if not link.url.startswith(self.slow):
+                return None
+            return HTMLPage('', link.url)
+        start = time.time()
+        page = selector.get_page(self.index + 'simple/', fetch)
+        assert page.url == self.slow + 'simple/'
+        assert time.time() - start < selector.default_hedge_delay
+        assert selector.ranked() == [self.slow, self.fast, self.index]
+
+    @patch('pip.index.urlopen')
+    def test_replicas_are_probed_without_stored_stats(self, mock_urlopen):
+        def urlopen(request):
+            if request.get_full_url() == self.fast:
+                raise URLError('down')
+            return mock_urlopen.return_value
+        mock_urlopen.side_effect = urlopen
+        selector = MirrorSelector(self.index, [self.fast, self.slow], self.cache)
+        assert selector.ranked()[-1] == self.fast
+        assert [request.get_method() for ((request,), kw)
+                in mock_urlopen.call_args_list] == ['HEAD'] * 3
+        stats = self.cache.get_mirror_stats()
+        assert stats['replicas'][self.fast]['failures'] == 1
+
+    def test_finder_uses_selector_instead_of_crawling_mirrors(self):
+        finder = PackageFinder([], [self.index], use_mirrors=True,
+                               mirrors=['fast'], mirror_selection='fastest')
+        assert finder.mirror_selector.replicas == [self.index, self.fast]
+        assert finder.mirror_selector.covers(self.index + 'simple/')
+        assert not finder.mirror_selector.covers(self.fast + 'simple/')
+
+    @patch('pip.index.urlopen')
+    def test_finder_gets_page_from_main_index_replica(self, mock_urlopen):
+        """
+        Test the main index is asked for its own pages, rather than waiting
+        on the fetch of the page it is asked for
+        """
+        url = self.index + 'simple/'
+        asked = []
+
+        def urlopen(request):
+            asked.append(request.get_full_url())
+            if not request.get_full_url().startswith(self.index):
+                raise URLError('down')
+            return compressed_response(request.get_full_url(), b(''), None)
+        mock_urlopen.side_effect = urlopen
+        finder = PackageFinder([], [self.index], use_mirrors=True,
+                               mirrors=['fast'], mirror_selection='fastest')
+        finder.cache = self.cache
+        self.selector({self.index: [1], self.fast: [0.1]})
+        finder.mirror_selector.cache = self.cache
+        results = []
+        t = threading.Thread(target=lambda: results.append(
+            finder._get_page(Link(url), None)))
+        t.setDaemon(True)
+        t.start()
+        t.join(5)
+        assert results and results[0].url == url, asked
+        assert url in asked
+
+
+
+def test_page_cache_fetches_a_url_once_for_concurrent_callers():
+    """
+    Test threads asking for the same page share a single fetch
+    """
+    cache = PageCache()
+    page = HTMLPage('', 'http://pypi/simple/simple/')
+    calls = []
+    started = threading.Event()
+    release = threading.Event()
+
+    def fetch():
+        calls.append(1)
+        started.set()
+        release.wait(10)
+        cache.add_page(['http://pypi/simple/simple/'], page)
+        return page
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(
+        cache.get_or_fetch('http://pypi/simple/simple/', fetch)))
+        for i in range(5)]
+    threads[0].start()
+    started.wait(10)
+    for t in threads[1:]:
+        t.start()
+    release.set()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1
+    assert results == [page] * 5
+    assert not cache._pending
+
+
+def test_page_cache_fetch_error_is_shared_and_not_cached():
+    cache = PageCache()
+
+    def fetch():
+        raise ValueError('broken')
+    assert_raises_regexp(ValueError, 'broken', cache.get_or_fetch, 'http://pypi/', fetch)
+    assert cache.get_or_fetch('http://pypi/', lambda: None) is None
+    assert not cache._pending
+
+
+class TestDiskPageCache(object):
+
+    def setup(self):
+        self.cache_dir = mkdtemp()
+
+    def teardown(self):
+        rmtree(self.cache_dir)
+
+    def test_stored_page_is_reused(self):
+        """
+        Test a stored page is loaded back with its validators and is fresh
+        """
+        cache = DiskPageCache(self.cache_dir, max_age=60)
+        page = HTMLPage('<a href="simple-1.0.tar.gz">', 'http://pypi/simple/simple/',
+                        {'ETag': '"abc"', 'Server': 'test'})
+        cache.store_page('http://pypi/simple/simple/', page)
+        stored, fresh = DiskPageCache(self.cache_dir, max_age=60).get_stored_page(
+            'http://pypi/simple/simple/')
+        assert fresh
+        assert stored.content == page.content
+        assert stored.url == page.url
+        assert stored.headers == {'ETag': '"abc"'}
+
+    def test_stored_page_expires(self):
+        cache = DiskPageCache(self.cache_dir, max_age=0)
+        cache.store_page('http://pypi/simple/simple/',
+                         HTMLPage('', 'http://pypi/simple/simple/', {}))
+        stored, fresh = cache.get_stored_page('http://pypi/simple/simple/')
+        assert stored is not None
+        assert not fresh
+
+    def test_local_pages_are_not_stored(self):
+        cache = DiskPageCache(self.cache_dir)
+        cache.store_page(find_links, HTMLPage('', find_links, {}))
+        assert not os.listdir(self.cache_dir)
+
+    def test_cache_is_pruned_to_max_size(self):
+        cache = DiskPageCache(self.cache_dir, max_size=0)
+        cache.store_page('http://pypi/simple/simple/',
+                         HTMLPage('x' * 100, 'http://pypi/simple/simple/', {}))
+        assert not os.listdir(self.cache_dir)
+
+    def test_cache_size_tracked_without_rescanning(self):
+        """
+        Test the cache directory is scanned once, not for every write, and
+        its side files count toward its size
+        """
+        cache = DiskPageCache(self.cache_dir)
+        real_listdir = os.listdir
+        with patch('os.listdir') as mock_listdir:
+            mock_listdir.side_effect = real_listdir
+            for i in range(5):
+                url = 'http://pypi/simple/p%s/' % i
+                cache.store_page(url, HTMLPage('x' * 100, url, {}))
+            cache.store_names('http://pypi/simple/', ['p0'], {})
+            assert mock_listdir.call_count == 1
+        assert cache._size == sum([os.path.getsize(os.path.join(self.cache_dir, name))
+                                   for name in os.listdir(self.cache_dir)])
+
+    def test_pruning_removes_side_files(self):
+        cache = DiskPageCache(self.cache_dir)
+        cache.store_names('http://pypi/simple/', ['simple'], {})
+        cache.max_size = 0
+        cache.store_page('http://pypi/simple/', HTMLPage('x', 'http://pypi/simple/', {}))
+        assert not os.listdir(self.cache_dir)
+
+    @patch('pip.index.urlopen')
+    def test_not_modified_reuses_stored_page(self, mock_urlopen):
+        """
+        Test a stale page is revalidated and reused on a 304 response
+        """
+        url = 'http://pypi/simple/simple/'
+        cache = DiskPageCache(self.cache_dir, max_age=0)
+        cache.store_page(url, HTMLPage('<a href="simple-1.0.tar.gz">', url,
+                                       {'ETag': '"abc"'}))
+        mock_urlopen.side_effect = HTTPError(url, 304, 'Not Modified', {}, None)
+
+        page = HTMLPage.get_page(Link(url), None, cache=cache)
+
+        request = mock_urlopen.call_args[0][0]
+        assert request.get_header('If-none-match') == '"abc"'
+        assert [link.url for link in page.links] == ['http://pypi/simple/simple/simple-1.0.tar.gz']
+        assert cache.get_page(url) is page
+
+    @patch('pip.index.urlopen')
+    def test_remembered_failures_skip_url_and_host(self, mock_urlopen):
+        """
+        Test dead homepage links and unreachable hosts are skipped in
+        later runs until a fetch from them succeeds
+        """
+        dead_url = 'http://example.com/gone/'
+        mock_urlopen.side_effect = HTTPError(dead_url, 404, 'Not Found', {}, None)
+        cache = DiskPageCache(self.cache_dir)
+        assert HTMLPage.get_page(Link(dead_url), None, cache=cache,
+                                 remember_failures=True) is None
+        mock_urlopen.side_effect = URLError('timed out')
+        assert HTMLPage.get_page(Link('http://down.com/'), None, cache=cache,
+                                 remember_failures=True) is None
+        assert mock_urlopen.call_count == 2
+
+        cache = DiskPageCache(self.cache_dir)
+        assert cache.is_dead(dead_url)
+        assert not cache.is_dead('http://example.com/other/')
+        assert cache.is_dead('http://down.com/other/')
+        assert HTMLPage.get_page(Link(dead_url), None, cache=cache,
+                                 remember_failures=True) is None
+        assert mock_urlopen.call_count == 2
+
+        cache.add_page(['http://down.com/other/'], HTMLPage('', 'http://down.com/other/'))
+        assert not DiskPageCache(self.cache_dir).is_dead('http://down.com/another/')
+
+    def test_failures_back_off_exponentially(self):
+        cache = DiskPageCache(self.cache_dir)
+        url = 'http://example.com/gone/'
+        cache.add_page_failure(url, 2, remember=True)
+        first = cache._get_dead()['urls'][url][1]
+        cache.add_page_failure(url, 2, remember=True)
+        count, until = cache._get_dead()['urls'][url]
+        assert count == 2
+        assert until - first >= cache.failure_backoff - 1
 
+    def test_failures_not_asked_to_be_remembered_are_not_stored(self):
+        cache = DiskPageCache(self.cache_dir)
+        cache.add_page_failure('http://pypi/simple/simple/', 2)
+        assert not DiskPageCache(self.cache_dir).is_dead('http://pypi/simple/simple/')
@@ -0,0 +1,123 @@
+import threading
+import time
+from pip.pool import WorkerPool, FetchPool, Future, CancelledError
+from tests.lib import assert_raises_regexp
+
+
+def test_worker_pool_runs_calls():
+    pool = WorkerPool(3)
+    futures = [pool.submit(pow, 2, n) for n in range(10)]
+    assert [f.result() for f in futures] == [2 ** n for n in range(10)]
+    assert len(pool._threads) == 3
+    pool.shutdown()
+    assert not pool._threads
+
+
+def test_worker_pool_reraises_errors():
+    def fail():
+        raise ValueError('broken')
+    pool = WorkerPool(1)
+    future = pool.submit(fail)
+    assert future.wait()
+    assert isinstance(future.exception(), ValueError)
+    assert_raises_regexp(ValueError, 'broken', future.result)
+    pool.shutdown()
+
+
+def test_future_done_callbacks():
+    calls = []
+    future = Future()
+    future.add_done_callback(calls.append)
+    assert not calls
+    future.set_result(1)
+    future.add_done_callback(calls.append)
+    assert calls == [future, future]
+
+
+def test_fetch_pool_limits_fetches_per_host():
+    """
+    Test a busy host doesn't get more than its share of the workers, nor
+    hold up fetches from other hosts
+    """
+    pool = FetchPool(3, 2)
+    release = threading.Event()
+    lock = threading.Lock()
+    running = {}
+    most = {}
+
+    def fetch(host):
+        lock.acquire()
+        running[host] = running.get(host, 0) + 1
+        most[host] = max(most.get(host, 0), running[host])
+        lock.release()
+        if host == 'slow':
+            release.wait(10)
+        lock.acquire()
+        running[host] -= 1
+        lock.release()
+        return host
+
+    slow = [pool.submit('http://slow/%s/' % i, fetch, 'slow') for i in range(4)]
+    fast = [pool.submit('http://FAST/%s/' % i, fetch, 'fast') for i in range(4)]
+    assert [f.result() for f in fast] == ['fast'] * 4
+    assert not [f for f in slow if f.done()]
+    release.set()
+    assert [f.result() for f in slow] == ['slow'] * 4
+    assert most == {'slow': 2, 'fast': 1}
+    assert len(pool._threads) == 3
+    pool.shutdown()
+    assert not pool._threads
+
+
+def test_fetch_pool_runs_burst_in_parallel():
+    """
+    Test fetches submitted in a row, while a worker is idle, each get a
+    thread
+    """
+    pool = FetchPool(4, 4)
+    assert pool.submit('http://host/0/', pow, 2, 0).result() == 1
+    lock = threading.Lock()
+    running = [0]
+    most = [0]
+
+    def fetch(n):
+        lock.acquire()
+        running[0] += 1
+        most[0] = max(most[0], running[0])
+        lock.release()
+        time.sleep(0.3)
+        lock.acquire()
+        running[0] -= 1
+        lock.release()
+        return n
+
+    start = time.time()
+    futures = [pool.submit('http://host/%s/' % n, fetch, n) for n in range(4)]
+    assert [f.result() for f in futures] == list(range(4))
+    elapsed = time.time() - start
+    assert len(pool._threads) == 4
+    assert most[0] == 4
+    assert elapsed < 0.9
+    pool.shutdown()
+
+
+def test_fetch_pool_skips_cancelled_fetches():
+    pool = FetchPool(1, 1)
+    release = threading.Event()
+    calls = []
+
+    def fetch(n):
+        calls.append(n)
+        release.wait(10)
+        return n
+    running = pool.submit('http://host/1/', fetch, 1)
+    waiting = pool.submit('http://host/2/', fetch, 2)
+    assert waiting.cancel()
+    assert waiting.cancelled()
+    assert_raises_regexp(CancelledError, '', waiting.result)
+    release.set()
+    assert running.result() == 1
+    assert not running.cancel()
+    assert pool.submit('http://host/3/', fetch, 3).result() == 3
+    assert calls == [1, 3]
+    pool.shutdown()
@@ -1,11 +1,12 @@
 import os
 import shutil
 import tempfile
+import threading
 
 from mock import Mock, patch
 from nose.tools import assert_equal, assert_raises
-from pip.exceptions import PreviousBuildDirError
-from pip.index import PackageFinder
+from pip.exceptions import DistributionNotFound, PreviousBuildDirError
+from pip.index import Link, PackageFinder
 from pip.log import logger
 from pip.req import (InstallRequirement, RequirementSet, parse_editable,
                      Requirements, parse_requirements)
@@ -69,6 +70,69 @@ class TestRequirementSet(object):
         reqset = self.basic_reqset(skip_reqs={'simple':''})
         assert False == reqset.add_requirement(req)
 
+    def test_early_lookups_run_in_background(self):
+        """Test _start_downloads() doesn't wait for the lookups"""
+
+        reqset = RequirementSet(None, None, None, ignore_installed=True,
+                                download_workers=2)
+        reqset.downloader = Mock()
+        finder = Mock(dependency_links=[])
+        lookups = threading.Event()
+        finder.find_requirement.side_effect = lambda req, upgrade: (
+            lookups.wait(5) and Link('http://example.com/simple-1.0.tar.gz'))
+        req = InstallRequirement.from_line('simple')
+        reqset._start_downloads(finder, [req])
+        assert not reqset.downloader.start.called
+        lookups.set()
+        link = reqset._take_early_link(finder, req)
+        assert link.filename == 'simple-1.0.tar.gz', link
+        assert reqset.downloader.start.called
+        reqset._lookup_pool.shutdown()
+
+    def test_early_lookups_are_quiet(self):
+        """Test the background lookups neither log nor change the indent"""
+
+        reqset = RequirementSet(None, None, None, ignore_installed=True,
+                                download_workers=2)
+        reqset.downloader = Mock()
+        finder = Mock(dependency_links=[])
+
+        def find_requirement(req, upgrade):
+            logger.indent += 2
+            logger.fatal('Could not find any downloads')
+            raise DistributionNotFound()
+        finder.find_requirement.side_effect = find_requirement
+        req = InstallRequirement.from_line('simple')
+        reqset._start_downloads(finder, [req])
+        assert reqset._take_early_link(finder, req) is None
+        reqset._lookup_pool.shutdown()
+        assert logger.indent == 0
+        assert not logger.consumers[0][1].called
+
+    def test_early_lookups_redone_for_new_dependency_links(self):
+        """Test early links found before new dependency links aren't used"""
+
+        reqset = RequirementSet(None, None, None, ignore_installed=True,
+                                download_workers=2)
+        reqset.downloader = Mock()
+        finder = Mock(dependency_links=[])
+        finder.find_requirement.return_value = Link(
+            'http://example.com/simple-1.0.tar.gz')
+        req = InstallRequirement.from_line('simple')
+        reqset._start_downloads(finder, [req])
+        reqset._early_links[req][1].wait()
+        finder.dependency_links.append('http://example.com/deps/')
+        finder.find_requirement.return_value = Link(
+            'http://example.com/deps/simple-1.1.tar.gz')
+        reqset._start_downloads(finder, [req])
+        link = reqset._take_early_link(finder, req)
+        assert link.filename == 'simple-1.1.tar.gz', link
+
+        reqset._start_downloads(finder, [req])
+        finder.dependency_links.append('http://example.com/more-deps/')
+        assert reqset._take_early_link(finder, req) is None
+        reqset._lookup_pool.shutdown()
+
 
 def test_url_with_query():
     """InstallRequirement should strip the fragment, but not the query."""
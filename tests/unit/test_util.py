@@ -3,12 +3,17 @@ util tests
 
 """
 import os
+import stat
 import sys
+from io import BytesIO
+from shutil import rmtree
+from tempfile import mkdtemp
 
 from mock import Mock, patch
 from nose.tools import eq_, assert_raises
 from pip.exceptions import BadCommand
-from pip.util import egg_link_path, Inf, get_installed_distributions, find_command
+from pip.util import (egg_link_path, Inf, get_installed_distributions,
+                      find_command, read_chunks, copy_file)
 from tests.lib import reset_env, mkdir, write_file
 
 
@@ -273,6 +278,37 @@ def test_find_command_trys_supplied_pathext(mock_isfile, getpath_mock):
     assert not getpath_mock.called, "Should not call get_pathext"
 
 
+def test_read_chunks():
+    content = 'abcdefghij'.encode()
+    chunks = [bytearray(chunk) for chunk in read_chunks(BytesIO(content), 4)]
+    assert chunks == ['abcd'.encode(), 'efgh'.encode(), 'ij'.encode()]
 
 
+class Tests_copy_file:
+    "util.copy_file() tests"
 
+    def setup(self):
+        self.tempdir = mkdtemp()
+        self.src = os.path.join(self.tempdir, 'src')
+        f = open(self.src, 'wb')
+        f.write('content'.encode())
+        f.close()
+        os.chmod(self.src, stat.S_IRUSR | stat.S_IWUSR | stat.S_IXUSR)
+
+    def teardown(self):
+        rmtree(self.tempdir, ignore_errors=True)
+
+    def test_copy(self):
+        dst = os.path.join(self.tempdir, 'dst')
+        copy_file(self.src, dst)
+        assert open(dst, 'rb').read() == 'content'.encode()
+        assert os.stat(dst).st_mode == os.stat(self.src).st_mode
+        if hasattr(os, 'link'):
+            assert not os.path.samefile(self.src, dst)
+
+    def test_hardlink(self):
+        dst = os.path.join(self.tempdir, 'dst')
+        copy_file(self.src, dst, hardlink=True)
+        assert open(dst, 'rb').read() == 'content'.encode()
+        if hasattr(os, 'link'):
+            assert os.path.samefile(self.src, dst)
@@ -129,6 +129,21 @@ class TestWheelFile(object):
         w = wheel.Wheel('simple-0.1-py2-none-TEST.whl')
         assert w.support_index_min() == 0
 
+    @patch('pip.wheel.supported_tags', [
+        ('py2', 'none', 'TEST'),
+        ('py2', 'none', 'any'),
+        ('py2', 'none', 'TEST'),
+        ])
+    def test_support_index_min_repeated_tag(self):
+        """
+        Test a tag listed twice in supported_tags ranks by its first index
+        """
+        w = wheel.Wheel('simple-0.1-py2-none-TEST.whl')
+        assert w.support_index_min() == 0
+        w = wheel.Wheel('simple-0.1-py2-none-any.TEST.whl')
+        assert w.support_index_min() == 0
+        assert w.supported()
+
     @patch('pip.wheel.supported_tags', [])
     def test_support_index_min_none(self):
         """